@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+
+"""Benchmark every pattern on every layout.
+
+Renders each pattern in python_clients/patterns/ on each layout in layouts/
+as fast as possible, sends the frames to a null OPC server running in the
+background which throws them away, and reports how long each stage of a
+frame took:
+
+    render: computing the colors
+    pack: turning the colors into an OPC message
+    send: writing the message to the socket
+
+along with the frame rate achieved.  Both the numpy frame_colors and the
+original per-pixel pixel_color of each pattern are measured.
+
+To run:
+
+    python_clients/benchmark.py
+
+Save the results with --output and compare a later run against them with
+--compare to see whether a change made things faster or slower:
+
+    python_clients/benchmark.py --output before.json
+    ...
+    python_clients/benchmark.py --compare before.json
+
+"""
+
+from __future__ import division, print_function
+import glob
+import json
+import optparse
+import os
+import pkgutil
+import platform
+import subprocess
+import sys
+import time
+
+import numpy
+
+import layout
+import opc
+import opc_sink
+import patterns
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+#-------------------------------------------------------------------------------
+# benchmark
+
+def find_patterns():
+    """Return the modules in the patterns package, sorted by name."""
+    names = sorted(name for _, name, _ in pkgutil.iter_modules(patterns.__path__))
+    modules = []
+    for name in names:
+        __import__('patterns.' + name)
+        modules.append(sys.modules['patterns.' + name])
+    return modules
+
+
+def make_renderers(coordinates):
+    """Return a dict of functions which render a pattern module at time t on the layout.
+
+    'array' uses the pattern's frame_colors, and 'pixel' its pixel_color.
+
+    """
+    renderer = patterns.Renderer(coordinates)
+    coordinate_list = renderer.coordinates.tolist()
+    random_list = renderer.random_values.tolist()
+    n_pixels = renderer.n_pixels
+
+    def array(pattern, t):
+        return renderer.frame_colors(pattern, t)
+
+    def pixel(pattern, t):
+        return [pattern.pixel_color(t, coord, ii, n_pixels, random_list)
+                for ii, coord in enumerate(coordinate_list)]
+
+    return {'array': array, 'pixel': pixel}
+
+
+RENDERERS = ['array', 'pixel']
+
+
+def run(pattern, render, client, frames, seconds):
+    """Render and send frames until there have been the given number or the time is up.
+
+    Returns a dict of results.
+
+    """
+    # the first frame does the pattern's precompute, so it's timed separately
+    setup_start = opc._clock()
+    render(pattern, 0)
+    setup = opc._clock() - setup_start
+
+    times = numpy.zeros((frames, 3))
+    start = opc._clock()
+    n = 0
+    while n < frames and (n == 0 or opc._clock() - start < seconds):
+        t = n / 20
+        t0 = opc._clock()
+        pixels = render(pattern, t)
+        t1 = opc._clock()
+        # packed like put_pixels does, on channels from 1 up so that layouts
+        # too big for one message are split into strands
+        data, strands = client._split(pixels, 1)
+        if strands is None:
+            message = client._build_message(data, 1)
+        else:
+            message = client._build_messages(strands)
+        t2 = opc._clock()
+        client._send_message(message)
+        t3 = opc._clock()
+        times[n] = (t1 - t0, t2 - t1, t3 - t2)
+        n += 1
+    elapsed = opc._clock() - start
+    times = times[:n] * 1000
+
+    result = {
+        'frames': n,
+        'setup_ms': setup * 1000,
+        'fps': n / elapsed,
+    }
+    for ii, stage in enumerate(['render', 'pack', 'send']):
+        result[stage + '_ms'] = float(times[:, ii].mean())
+        result[stage + '_p95_ms'] = float(numpy.percentile(times[:, ii], 95))
+    return result
+
+
+def environment():
+    """Return a dict describing where the benchmark was run."""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                         stderr=open(os.devnull, 'w')).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def key(result):
+    return (result['pattern'], result['layout'], result['renderer'])
+
+
+#-------------------------------------------------------------------------------
+# main
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-l', '--layouts', dest='layouts',
+                        default=os.path.join(ROOT, 'layouts', '*.json'),
+                        action='store', type='string',
+                        help='glob of layout files to use')
+    parser.add_option('-p', '--patterns', dest='patterns', default='',
+                        action='store', type='string',
+                        help='comma separated names of the patterns to run.  default: all')
+    parser.add_option('-r', '--renderers', dest='renderers', default='array,pixel',
+                        action='store', type='string',
+                        help='comma separated renderers to measure: array (frame_colors) and/or pixel (pixel_color)')
+    parser.add_option('-n', '--frames', dest='frames', default=100,
+                        action='store', type='int',
+                        help='number of frames to run for each combination')
+    parser.add_option('-t', '--seconds', dest='seconds', default=5,
+                        action='store', type='float',
+                        help='stop each combination early after this many seconds')
+    parser.add_option('-g', '--gamma', dest='gamma', default=1,
+                        action='store', type='float',
+                        help='gamma curve to apply while packing')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                        action='store', type='string',
+                        help='save the results to this JSON file')
+    parser.add_option('-c', '--compare', dest='compare', default=None,
+                        action='store', type='string',
+                        help='compare the fps with the results saved in this JSON file')
+    options, args = parser.parse_args()
+
+    renderers = options.renderers.split(',')
+    for name in renderers:
+        if name not in RENDERERS:
+            parser.error('unknown renderer: %s' % name)
+    pattern_modules = find_patterns()
+    if options.patterns:
+        wanted = options.patterns.split(',')
+        pattern_modules = [p for p in pattern_modules if p.__name__.split('.')[-1] in wanted]
+    layout_paths = sorted(glob.glob(options.layouts))
+    if not pattern_modules or not layout_paths:
+        parser.error('no patterns or no layouts to run')
+
+    previous = {}
+    if options.compare:
+        with open(options.compare) as f:
+            previous = dict((key(r), r) for r in json.load(f)['results'])
+
+    sink = opc_sink.NullSink()
+    client = opc.Client(sink.server_ip_port)
+    client.set_color_correction(gamma=options.gamma)
+    if not client.can_connect():
+        print('ERROR: could not connect to the null server', file=sys.stderr)
+        sys.exit(1)
+
+    header = '%-16s %-30s %-6s %7s %9s %9s %9s %9s' % (
+        'pattern', 'layout', 'mode', 'pixels', 'render ms', 'pack ms', 'send ms', 'fps')
+    if previous:
+        header += '   change'
+    print(header)
+    print('-' * len(header))
+
+    results = []
+    for path in layout_paths:
+        # the same random values for every run, so that runs can be compared
+        numpy.random.seed(0)
+        coordinates = layout.load(path)
+        layout_renderers = make_renderers(coordinates)
+        for pattern in pattern_modules:
+            for name in renderers:
+                result = run(pattern, layout_renderers[name], client,
+                             options.frames, options.seconds)
+                result.update({
+                    'pattern': pattern.__name__.split('.')[-1],
+                    'layout': os.path.basename(path),
+                    'renderer': name,
+                    'pixels': len(coordinates),
+                })
+                results.append(result)
+                line = '%-16s %-30s %-6s %7d %9.3f %9.3f %9.3f %9.1f' % (
+                    result['pattern'], result['layout'], name, result['pixels'],
+                    result['render_ms'], result['pack_ms'], result['send_ms'], result['fps'])
+                if key(result) in previous:
+                    line += ' %+7.1f%%' % ((result['fps'] / previous[key(result)]['fps'] - 1) * 100)
+                print(line)
+                sys.stdout.flush()
+
+    client.disconnect()
+    sink.stop()
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f,
+                      indent=2, sort_keys=True)
+        print()
+        print('saved results to %s' % options.output)
+
+
+if __name__ == '__main__':
+    main()
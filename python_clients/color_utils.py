@@ -1,10 +1,24 @@
 #!/usr/bin/env python
 
-"""Helper functions to make color manipulations easier."""
+"""Helper functions to make color manipulations easier.
+
+Each function also has an array version, named with an _array suffix, which
+works on a whole frame at once using numpy.  Colors are given to these as
+float arrays of (r, g, b) values shaped (n_pixels, 3), and single values as
+arrays of any shape.  The array versions take an optional out argument:
+a preallocated float array of the result's shape to write the result into
+instead of allocating a new one.  out may be the input array itself.
+
+"""
 
 from __future__ import division
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 def remap(x, oldmin, oldmax, newmin, newmax):
     """Remap the float x from the range oldmin-oldmax to the range newmin-newmax
 
@@ -85,3 +99,76 @@ def gamma(color, gamma):
     r, g, b = color
     return (max(r, 0) ** gamma, max(g, 0) ** gamma, max(b, 0) ** gamma)
 
+
+#-------------------------------------------------------------------------------
+# array versions
+
+def remap_array(x, oldmin, oldmax, newmin, newmax, out=None):
+    """Array version of remap."""
+    out = numpy.subtract(x, oldmin, out=out, dtype=float)
+    out *= (newmax-newmin) / (oldmax-oldmin)
+    out += newmin
+    return out
+
+def clamp_array(x, minn, maxx, out=None):
+    """Array version of clamp."""
+    return numpy.clip(x, minn, maxx, out=out)
+
+def cos_array(x, offset=0, period=1, minn=0, maxx=1, out=None):
+    """Array version of cos."""
+    out = numpy.divide(x, period, out=out, dtype=float)
+    out -= offset
+    out *= math.pi * 2
+    numpy.cos(out, out=out)
+    out *= (maxx-minn) / 2
+    out += (maxx-minn) / 2 + minn
+    return out
+
+def contrast_array(colors, center, mult, out=None):
+    """Array version of contrast."""
+    out = numpy.subtract(colors, center, out=out, dtype=float)
+    out *= mult
+    out += center
+    return out
+
+def clip_black_by_luminance_array(colors, threshold, out=None, scratch=None):
+    """Array version of clip_black_by_luminance.
+
+    scratch: an optional float array shaped like colors without its last
+        axis, to work in instead of allocating one.
+
+    """
+    # 1 for the pixels to keep and 0 for the dark ones
+    keep = numpy.sum(colors, axis=-1, out=scratch)
+    numpy.greater_equal(keep, threshold*3, out=keep)
+    return numpy.multiply(colors, keep[..., numpy.newaxis], out=out, dtype=float)
+
+def clip_black_by_channels_array(colors, threshold, out=None, scratch=None):
+    """Array version of clip_black_by_channels.
+
+    scratch: an optional float array shaped like colors, to work in instead
+        of allocating one.  Not needed if out is given and isn't colors.
+
+    """
+    if scratch is None and out is not None and out is not colors:
+        scratch = out
+    # 1 for the values to keep and 0 for the dark ones
+    keep = numpy.greater_equal(colors, threshold, out=scratch)
+    return numpy.multiply(colors, keep, out=out, dtype=float)
+
+def mod_dist_array(a, b, n, out=None):
+    """Array version of mod_dist."""
+    # with d = (a-b) % n, the shorter way around is min(d, n-d),
+    # which is n/2 - abs(d - n/2)
+    out = numpy.subtract(a, b, out=out, dtype=float)
+    numpy.mod(out, n, out=out)
+    out -= n / 2
+    numpy.abs(out, out=out)
+    numpy.subtract(n / 2, out, out=out)
+    return out
+
+def gamma_array(colors, gamma, out=None):
+    """Array version of gamma."""
+    out = numpy.maximum(colors, 0, out=out, dtype=float)
+    numpy.power(out, gamma, out=out)
+    return out
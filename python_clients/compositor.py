@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+"""Layer several patterns on top of each other, and crossfade between them.
+
+A Compositor keeps a stack of layers, each showing a pattern module from
+python_clients/patterns/.  To draw a frame, it renders each layer and
+combines it with the layers below using the layer's blend mode:
+
+    add: add the layer's colors to those below
+    multiply: multiply the colors below by the layer's, as fractions of 255
+    screen: the opposite of multiply, which lightens the colors below
+    max: the brighter of the layer's colors and those below
+    alpha: cover the layers below
+
+Each layer also has an opacity from 0 to 1 which says how much of the
+blended result to use, and which can fade over time.  Layers which are
+faded out, or covered by an opaque alpha layer, aren't rendered at all.
+
+All the blending is done on whole frames at once with numpy, into buffers
+which are reused for every frame.
+
+Recommended use:
+
+    import compositor
+    import opc
+    import patterns
+    import patterns.lava_lamp
+    import patterns.sailor_moon
+    import patterns.miami
+
+    renderer = patterns.Renderer(coordinates)
+    layers = compositor.Compositor(renderer)
+    layers.add(patterns.lava_lamp)
+    layers.add(patterns.sailor_moon, mode='screen', opacity=0.7)
+    frame = opc.PixelBuffer(renderer.n_pixels)
+    while True:
+        t = time.time() - start_time
+        if t > 60 and not switched:
+            # fade to miami over 5 seconds
+            layers.crossfade(patterns.miami, t, 5)
+            switched = True
+        layers.render(t, out=frame)
+        client.put_pixels(frame, channel=0)
+
+"""
+
+from __future__ import division
+
+import numpy
+
+import opc
+
+MODES = ('add', 'multiply', 'screen', 'max', 'alpha')
+
+
+class Layer(object):
+
+    def __init__(self, pattern, n_pixels, mode='alpha', opacity=1):
+        """Create a layer which shows a pattern module.
+
+        Use Compositor.add instead of creating layers directly.
+
+        """
+        if mode not in MODES:
+            raise ValueError('mode must be one of %s, not %r' % (', '.join(MODES), mode))
+        self.pattern = pattern
+        self.mode = mode
+        # the layer's colors are rendered into this for every frame
+        self.frame = opc.PixelBuffer(n_pixels)
+        # (start time, end time, opacity at start, opacity at end)
+        self._fade = (0, 0, opacity, opacity)
+        # True for layers added by Compositor.crossfade, which replace the
+        # layers below once they've faded in
+        self.replaces_below = False
+
+    def opacity(self, t):
+        """Return the layer's opacity at time t."""
+        start, end, start_opacity, end_opacity = self._fade
+        if t >= end:
+            return end_opacity
+        if t <= start:
+            return start_opacity
+        return start_opacity + (end_opacity - start_opacity) * (t - start) / (end - start)
+
+    def fade(self, opacity, t, duration):
+        """Fade from the opacity at time t to the given opacity over duration seconds."""
+        self._fade = (t, t + duration, self.opacity(t), opacity)
+
+    def fading(self, t):
+        """Return True if the layer's opacity is still changing at time t."""
+        return t < self._fade[1]
+
+
+class Compositor(object):
+
+    def __init__(self, renderer):
+        """Create an empty stack of layers which are rendered with renderer.
+
+        renderer: a patterns.Renderer or parallel.PoolRenderer for the layout.
+
+        """
+        self.renderer = renderer
+        self.layers = []  # from the bottom up
+        n_pixels = renderer.n_pixels
+        self._scratch = numpy.zeros((n_pixels, 3), dtype=numpy.float32)
+
+    def add(self, pattern, mode='alpha', opacity=1):
+        """Add a layer showing the pattern module on top, and return it."""
+        layer = Layer(pattern, self.renderer.n_pixels, mode, opacity)
+        self.layers.append(layer)
+        return layer
+
+    def remove(self, layer):
+        """Remove a layer."""
+        self.layers.remove(layer)
+
+    def crossfade(self, pattern, t, duration):
+        """Fade from the current layers to the pattern module over duration seconds, starting at time t.
+
+        The pattern is added as an alpha layer on top which fades in.  Once
+        it has, the layers below it are removed.  Returns the new layer.
+
+        """
+        layer = self.add(pattern, 'alpha', 0)
+        layer.fade(1, t, duration)
+        layer.replaces_below = True
+        return layer
+
+    def _visible_layers(self, t):
+        """Return the layers which can be seen at time t, from the bottom up."""
+        # nothing under an opaque alpha layer can be seen, but the layers
+        # under it are kept unless it's a crossfade, in case it fades out
+        for ii in range(len(self.layers) - 1, 0, -1):
+            layer = self.layers[ii]
+            if layer.mode == 'alpha' and layer.opacity(t) >= 1:
+                if layer.replaces_below and not layer.fading(t):
+                    # a crossfade is done, so the layers below are gone for good
+                    del self.layers[:ii]
+                    return self.layers
+                return self.layers[ii:]
+        return self.layers
+
+    def render(self, t, out):
+        """Render all the layers at time t, and combine them into out, an opc.PixelBuffer.
+
+        Returns out.
+
+        """
+        out.fill(0)
+        for layer in self._visible_layers(t):
+            opacity = layer.opacity(t)
+            if opacity <= 0:
+                continue
+            self.renderer.frame_colors(layer.pattern, t, out=layer.frame)
+            self._blend(out, layer.frame.colors, layer.mode, opacity)
+        return out
+
+    def _blend(self, out, colors, mode, opacity):
+        """Blend colors into out with the given mode and opacity."""
+        below = out.colors
+        if mode == 'alpha':
+            if opacity >= 1:
+                below[...] = colors
+            else:
+                out.blend(colors, opacity)
+            return
+
+        blended = self._scratch
+        if mode == 'add':
+            numpy.add(below, colors, out=blended)
+        elif mode == 'multiply':
+            numpy.multiply(below, colors, out=blended)
+            blended /= 255
+        elif mode == 'screen':
+            # 255 - (255 - below) * (255 - colors) / 255
+            numpy.multiply(below, colors, out=blended)
+            blended /= -255
+            blended += below
+            blended += colors
+        elif mode == 'max':
+            numpy.maximum(below, colors, out=blended)
+        if opacity >= 1:
+            below[...] = blended
+        else:
+            out.blend(blended, opacity)
@@ -7,13 +7,13 @@ game of life
 """
 
 from __future__ import division
-import time
 import os
 import sys
 import optparse
 import random
 
 import opc
+import scheduler
 
 # command line
 parser = optparse.OptionParser()
@@ -86,8 +86,9 @@ board = rand_board()
 
 
 client = opc.Client(options.server)
+frame_scheduler = scheduler.FrameScheduler(options.fps)
 while True:
     client.put_pixels(pixelify_board(board), channel=0)
     board = tick(board)
-    time.sleep(1 / options.fps)
+    frame_scheduler.wait()
 
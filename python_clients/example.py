@@ -17,9 +17,9 @@ Then run this script in another shell to send colors to the simulator
 
 """
 
-import time
 import random
 import opc
+import scheduler
 
 ADDRESS = 'localhost:7890'
 
@@ -36,6 +36,7 @@ else:
     print 'WARNING: could not connect to %s' % ADDRESS
 
 # Send pixels forever
+frame_scheduler = scheduler.FrameScheduler(fps=1/0.3)
 while True:
     my_pixels = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
     random.shuffle(my_pixels)
@@ -43,5 +44,5 @@ while True:
         print 'sent'
     else:
         print 'not connected'
-    time.sleep(0.3)
+    frame_scheduler.wait()
 
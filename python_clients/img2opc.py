@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+
+"""Show images and video on a layout, like Processing's img2opc library.
+
+A Sampler projects the points of a layout onto an image once, and works
+out which four image pixels around each point to blend, and by how much.
+After that, the colors for each frame of video are picked out of the
+image with a single numpy gather and a weighted sum, however the layout's
+pixels are arranged.
+
+The layout is projected along one axis, by default the one it's
+thinnest along, so a flat wall is seen face on.  The image is scaled to
+cover the whole layout, cropping the edges of the image which don't fit,
+like img2opc does.
+
+Recommended use:
+
+    import img2opc
+    import opc
+
+    sampler = img2opc.Sampler(coordinates, width=640, height=480)
+    frame = opc.PixelBuffer(len(coordinates))
+    for image in img2opc.raw_frames(movie_file, 640, 480):
+        # image is a numpy array of r, g, b bytes shaped (480, 640, 3)
+        sampler.sample(image, out=frame)
+        client.put_pixels(frame, channel=0)
+
+To play a video from the command line, have ffmpeg decode it to raw rgb:
+
+    ffmpeg -i movie.mp4 -f rawvideo -pix_fmt rgb24 -s 160x90 - | \\
+        python_clients/img2opc.py --layout layouts/wall.json --size 160x90 -
+
+or show a sequence of images (which needs the Python Imaging Library,
+except for .npy files):
+
+    python_clients/img2opc.py --layout layouts/wall.json --fps 10 frames/*.png
+
+"""
+
+from __future__ import division, print_function
+import optparse
+import sys
+
+import numpy
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+import layout
+import opc
+import scheduler
+
+AXES = 'xyz'
+FITS = ('crop', 'letterbox', 'stretch')
+
+
+def project(coordinates, axes=None):
+    """Return the layout's points in 2d, as (horizontal, vertical) pairs.
+
+    axes: two of 'x', 'y' and 'z' saying which axes are horizontal and
+        vertical, with the vertical axis pointing up, e.g. 'xz'.  By
+        default it's the two axes the layout is widest along, in order.
+
+    """
+    coordinates = numpy.asarray(coordinates, dtype=numpy.float64)
+    if axes is None:
+        extents = coordinates.max(axis=0) - coordinates.min(axis=0)
+        thinnest = int(numpy.argmin(extents))
+        axes = [ii for ii in range(3) if ii != thinnest]
+    else:
+        if len(axes) != 2 or axes[0] == axes[1] or not all(a in AXES for a in axes):
+            raise ValueError('axes must be two of x, y and z, like "xz", not %r' % (axes,))
+        axes = [AXES.index(a) for a in axes]
+    return coordinates[:, axes]
+
+
+class Sampler(object):
+
+    def __init__(self, coordinates, width, height, axes=None, fit='crop'):
+        """Create an object which samples images of the given size at the layout's points.
+
+        coordinates: the layout's points, e.g. from layout.load.
+        width, height: the size of the images, in pixels.
+        axes: which axes of the layout to project onto the image; see project.
+        fit: how to fit the image to the layout:
+            'crop': scale the image to cover the whole layout, cropping its
+                edges if the shapes are different.
+            'letterbox': scale the image to fit inside the layout.  Pixels
+                outside the image are black.
+            'stretch': stretch the image to the layout's shape.
+
+        """
+        if fit not in FITS:
+            raise ValueError('fit must be one of %s, not %r' % (', '.join(FITS), fit))
+        self.width = width
+        self.height = height
+        points = project(coordinates, axes)
+        self.n_pixels = len(points)
+
+        # where each point is in the image, in pixels, where the middle of
+        # the top left pixel is 0, 0 and the image goes up or down 0.5 from that
+        low = points.min(axis=0) if len(points) else numpy.zeros(2)
+        high = points.max(axis=0) if len(points) else numpy.zeros(2)
+        center = (low + high) / 2
+        extent = high - low
+        size = numpy.array([width, height], dtype=numpy.float64)
+        if fit == 'stretch':
+            # image pixels per layout unit, separately for each axis
+            scale = size / numpy.where(extent > 0, extent, 1)
+        else:
+            # the same for both axes, from the axes the layout isn't flat along
+            ratios = [s / e for s, e in zip(size, extent) if e > 0] or [1]
+            scale = numpy.repeat(min(ratios) if fit == 'crop' else max(ratios), 2)
+        x = (points[:, 0] - center[0]) * scale[0] + (width - 1) / 2
+        y = (center[1] - points[:, 1]) * scale[1] + (height - 1) / 2
+        outside = (x < -0.5) | (x > width - 0.5) | (y < -0.5) | (y > height - 0.5)
+        x = numpy.clip(x, 0, width - 1)
+        y = numpy.clip(y, 0, height - 1)
+
+        # the four pixels around each point and how much of each to use,
+        # with all the points' top left pixels first, then top right, etc.
+        x0 = numpy.minimum(numpy.floor(x).astype(numpy.intp), max(width - 2, 0))
+        y0 = numpy.minimum(numpy.floor(y).astype(numpy.intp), max(height - 2, 0))
+        x1 = numpy.minimum(x0 + 1, width - 1)
+        y1 = numpy.minimum(y0 + 1, height - 1)
+        fx = x - x0
+        fy = y - y0
+        self.indices = numpy.concatenate([y0 * width + x0, y0 * width + x1,
+                                          y1 * width + x0, y1 * width + x1])
+        weights = numpy.array([(1 - fx) * (1 - fy), fx * (1 - fy),
+                               (1 - fx) * fy, fx * fy], dtype=numpy.float32)
+        if fit == 'letterbox':
+            weights[:, outside] = 0
+        # shaped (4, n_pixels, 1) to multiply the gathered colors by
+        self.weights = weights[:, :, numpy.newaxis]
+
+        # the gathered pixels, and each corner's share of the colors, are
+        # put in these for every frame
+        self._gathered = numpy.zeros((4, self.n_pixels, 3), dtype=numpy.uint8)
+        self._scratch = numpy.zeros((self.n_pixels, 3), dtype=numpy.float32)
+
+    def sample(self, image, out=None):
+        """Return the colors of the layout's pixels from an image.
+
+        image: a numpy array of r, g, b bytes shaped (height, width, 3).
+            An alpha channel, if there's a fourth one, is ignored.
+        out: an optional opc.PixelBuffer to put the colors in, which is
+            then returned instead of a new float32 array shaped (n_pixels, 3).
+
+        """
+        image = numpy.asarray(image)
+        if image.ndim != 3 or image.shape[:2] != (self.height, self.width) or image.shape[2] < 3:
+            raise ValueError('the image must be shaped (%d, %d, 3), not %s'
+                             % (self.height, self.width, image.shape))
+        flat = image.reshape(-1, image.shape[2])
+        if flat.shape[1] != 3:
+            flat = flat[:, :3]
+        if image.dtype != numpy.uint8:
+            flat = numpy.clip(flat, 0, 255).astype(numpy.uint8)
+        gathered = self._gathered
+        numpy.take(flat, self.indices, axis=0, out=gathered.reshape(-1, 3))
+        colors = numpy.empty((self.n_pixels, 3), dtype=numpy.float32) if out is None else out.colors
+        # a weighted sum of the four corners, one corner at a time, which is
+        # quicker than numpy.einsum
+        numpy.multiply(gathered[0], self.weights[0], out=colors)
+        for corner in range(1, 4):
+            numpy.multiply(gathered[corner], self.weights[corner], out=self._scratch)
+            colors += self._scratch
+        return colors if out is None else out
+
+
+#-------------------------------------------------------------------------------
+# frame sources
+
+def raw_frames(f, width, height):
+    """Yield frames read from a file of raw r, g, b bytes, until it ends.
+
+    f: a file opened in binary mode, e.g. the output of
+        "ffmpeg -f rawvideo -pix_fmt rgb24".  Each frame is width * height
+        pixels, one row at a time from the top.
+
+    Each frame is a numpy array shaped (height, width, 3).  The same array
+    is read into every time, so use each frame before getting the next.
+
+    """
+    buf = bytearray(width * height * 3)
+    view = memoryview(buf)
+    frame = numpy.frombuffer(buf, dtype=numpy.uint8).reshape(height, width, 3)
+    while True:
+        got = 0
+        while got < len(buf):
+            n = f.readinto(view[got:])
+            if not n:
+                return
+            got += n
+        yield frame
+
+
+def load_image(path):
+    """Return the image at path as a numpy array shaped (height, width, 3).
+
+    .npy files are loaded with numpy.  Anything else needs the Python
+    Imaging Library.
+
+    """
+    if path.endswith('.npy'):
+        return numpy.load(path)
+    if Image is None:
+        raise ImportError('the Python Imaging Library (PIL or Pillow) is needed to load %s' % path)
+    return numpy.asarray(Image.open(path).convert('RGB'))
+
+
+def image_frames(paths):
+    """Yield the images at each of paths in turn, as for load_image."""
+    for path in paths:
+        yield load_image(path)
+
+
+#-------------------------------------------------------------------------------
+# command line
+
+def main():
+    parser = optparse.OptionParser(usage='usage: %prog [options] - | image [image ...]')
+    parser.add_option('-l', '--layout', dest='layout',
+                        action='store', type='string',
+                        help='layout file')
+    parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
+                        action='store', type='string',
+                        help='ip and port of server')
+    parser.add_option('-f', '--fps', dest='fps', default=30,
+                        action='store', type='int',
+                        help='frames per second')
+    parser.add_option('-g', '--gamma', dest='gamma', default=1,
+                        action='store', type='float',
+                        help='gamma curve to apply.  use 2.2 for live leds, 1 for the simulator')
+    parser.add_option('--size', dest='size', default=None,
+                        action='store', type='string',
+                        help='WIDTHxHEIGHT of raw rgb frames read from stdin')
+    parser.add_option('--axes', dest='axes', default=None,
+                        action='store', type='string',
+                        help='which axes of the layout are across and up the image, e.g. xz.  '
+                             'by default, the two the layout is widest along')
+    parser.add_option('--fit', dest='fit', default='crop',
+                        action='store', type='choice', choices=FITS,
+                        help='how to fit the image to the layout: %s' % ', '.join(FITS))
+    parser.add_option('--loop', dest='loop', default=False,
+                        action='store_true',
+                        help='show the images over and over')
+    parser.add_option('-c', '--channel', dest='channel', default=None,
+                        action='store', type='int',
+                        help='channel to send to.  layouts with more pixels than fit in one message '
+                             'go to consecutive channels starting here.  by default, 0 if the '
+                             'layout fits in one message, or 1')
+    options, args = parser.parse_args()
+
+    if not options.layout:
+        parser.error('you must specify a layout file using --layout')
+    if not args:
+        parser.error('give images to show, or - to read raw rgb frames from stdin')
+    coordinates = layout.load(options.layout)
+
+    # channel 0 goes to every channel, so layouts which need several channels
+    # start at 1 unless told otherwise
+    channel = options.channel
+    if channel is None:
+        channel = 0 if len(coordinates) <= opc.MAX_PIXELS else 1
+
+    if args == ['-']:
+        if not options.size:
+            parser.error('give the size of the frames on stdin with --size')
+        try:
+            width, height = [int(n) for n in options.size.lower().split('x')]
+        except ValueError:
+            parser.error('--size must be like 160x90, not %r' % options.size)
+        stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+        frames = raw_frames(stdin, width, height)
+    else:
+        try:
+            first = load_image(args[0])
+        except ImportError as e:
+            parser.error(str(e))
+        height, width = first.shape[:2]
+        if len(args) == 1:
+            # a still image only needs loading once
+            frames = iter([first])
+        else:
+            frames = image_frames(args)
+
+    client = opc.Client(options.server)
+    client.set_color_correction(gamma=options.gamma)
+    if client.can_connect():
+        print('    connected to %s' % options.server)
+    else:
+        # can't connect, but keep running in case the server appears later
+        print('    WARNING: could not connect to %s' % options.server)
+
+    sampler = Sampler(coordinates, width, height, axes=options.axes, fit=options.fit)
+    frame = opc.PixelBuffer(len(coordinates))
+    frame_scheduler = scheduler.FrameScheduler(options.fps)
+    print('    sending %dx%d frames (control-c to exit)...' % (width, height))
+    try:
+        while True:
+            for image in frames:
+                sampler.sample(image, out=frame)
+                client.put_pixels(frame, channel=channel)
+                frame_scheduler.wait()
+            if not options.loop or args == ['-']:
+                break
+            frames = image_frames(args) if len(args) > 1 else iter([first])
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
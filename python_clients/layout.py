@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+
+"""Load layout files quickly, using a compiled binary cache.
+
+A layout file is a JSON array of objects of the form {"point": [x, y, z]}.
+Parsing a big one and turning it into Python tuples is slow and takes a lot
+of memory, so the first time a layout is loaded its points are compiled into
+a cache file next to it (wall.json -> wall.json.cache) which holds them as a
+float32 array.  After that, loading the layout just memory-maps the cache.
+
+The cache is rebuilt when the layout file changes.  A cache whose layout
+file has a different modification time but the same contents is kept.
+
+Recommended use:
+
+    import layout
+
+    coordinates = layout.load('layouts/wall.json')
+    # coordinates is a read-only float32 array shaped (n_pixels, 3)
+
+To find pixels near other points, build a GridIndex of the layout once and
+query it with many points at a time:
+
+    index = layout.GridIndex(coordinates)
+    query_ii, pixel_ii, distances = index.query_radius(centers, 0.5)
+    pixel_ii, distances = index.query_knn(centers, 4)
+
+"""
+
+from __future__ import division
+import hashlib
+import os
+import struct
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import numpy
+
+# the cache file starts with this header, padded to HEADER_SIZE bytes:
+#   magic, number of points, layout file mtime, layout file size, sha1 of layout file
+_HEADER = struct.Struct('<8sQdQ20s')
+_HEADER_SIZE = 64
+_MAGIC = b'OPCLYT01'
+
+
+def cache_path(path):
+    """Return the path of the cache file for the given layout file."""
+    return path + '.cache'
+
+
+def load(path, use_cache=True):
+    """Return the points of the layout file at path.
+
+    Returns a float32 array of (x, y, z) coordinates shaped (n_pixels, 3).
+    Items in the layout without a "point" are skipped.
+
+    If use_cache is True, the array is memory-mapped from the cache file,
+    which is created or rebuilt first if needed.  It's read-only.  If the
+    cache file can't be written, the layout is parsed every time.
+
+    """
+    if not use_cache:
+        with open(path, 'rb') as f:
+            return _parse(f.read())
+
+    stat = os.stat(path)
+    header = _read_header(cache_path(path))
+    if header is not None:
+        n_points, mtime, size, digest = header
+        if mtime == stat.st_mtime and size == stat.st_size:
+            return _map(path, n_points)
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    new_digest = hashlib.sha1(raw).digest()
+    if header is not None and digest == new_digest:
+        # only the modification time changed
+        _write_header(path, n_points, stat, new_digest)
+        return _map(path, n_points)
+
+    points = _parse(raw)
+    try:
+        _write_cache(path, points, stat, new_digest)
+    except (IOError, OSError):
+        return points
+    return _map(path, len(points))
+
+
+def _parse(raw):
+    """Return the points in the raw contents of a layout file as a float32 array."""
+    items = json.loads(raw.decode('utf-8'))
+    points = [item['point'] for item in items if 'point' in item]
+    return numpy.array(points, dtype=numpy.float32).reshape(-1, 3)
+
+
+def _read_header(cache):
+    """Return (n_points, mtime, size, digest) from a cache file, or None if it's missing or invalid."""
+    try:
+        with open(cache, 'rb') as f:
+            data = f.read(_HEADER.size)
+    except (IOError, OSError):
+        return None
+    if len(data) != _HEADER.size:
+        return None
+    magic, n_points, mtime, size, digest = _HEADER.unpack(data)
+    if magic != _MAGIC:
+        return None
+    if os.path.getsize(cache) != _HEADER_SIZE + n_points * 3 * 4:
+        return None
+    return n_points, mtime, size, digest
+
+
+def _pack_header(n_points, stat, digest):
+    header = _HEADER.pack(_MAGIC, n_points, stat.st_mtime, stat.st_size, digest)
+    return header + b'\0' * (_HEADER_SIZE - len(header))
+
+
+def _write_header(path, n_points, stat, digest):
+    try:
+        with open(cache_path(path), 'r+b') as f:
+            f.write(_pack_header(n_points, stat, digest))
+    except (IOError, OSError):
+        pass
+
+
+def _write_cache(path, points, stat, digest):
+    # write to a temporary file first so that a half-written cache is never used
+    cache = cache_path(path)
+    temp = '%s.%d.tmp' % (cache, os.getpid())
+    try:
+        with open(temp, 'wb') as f:
+            f.write(_pack_header(len(points), stat, digest))
+            f.write(points.astype('<f4').tobytes())
+        os.rename(temp, cache)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def _map(path, n_points):
+    if n_points == 0:
+        return numpy.zeros((0, 3), dtype=numpy.float32)
+    return numpy.memmap(cache_path(path), dtype='<f4', mode='r',
+                        offset=_HEADER_SIZE, shape=(n_points, 3))
+
+
+class GridIndex(object):
+
+    def __init__(self, points, cell_size=None):
+        """Build a spatial index over points, an array shaped (n_points, 3).
+
+        The points are sorted into a uniform grid of cubes with sides of
+        cell_size.  By default it's chosen so that there are about as many
+        cells as points.  For radius queries, a cell_size around the radius
+        is best.
+
+        """
+        self.points = numpy.asarray(points, dtype=float).reshape(-1, 3)
+        n_points = len(self.points)
+        if n_points == 0:
+            raise ValueError('can not index an empty layout')
+
+        self.origin = self.points.min(axis=0)
+        extent = self.points.max(axis=0) - self.origin
+        if cell_size is None:
+            # spread the points over the dimensions the layout actually uses,
+            # ignoring any it's only thicker than a plane in by a rounding error
+            used = extent[extent > extent.max() * 1e-3]
+            if len(used):
+                cell_size = (numpy.prod(used) / n_points) ** (1 / len(used))
+            else:
+                cell_size = 1
+        self.cell_size = cell_size
+        self.shape = (extent // cell_size).astype(int) + 1
+
+        # sort the points by cell, and note where each cell's points start.
+        # only the cells with points in them are kept, so a small cell_size
+        # doesn't take a lot of memory
+        cells = self._cell_ids(self._cell_coords(self.points))
+        self.order = numpy.argsort(cells, kind='mergesort')
+        self.cell_ids, starts = numpy.unique(cells[self.order], return_index=True)
+        self.cell_starts = numpy.append(starts, n_points)
+
+    def _cell_coords(self, points):
+        return numpy.floor((points - self.origin) / self.cell_size).astype(int)
+
+    def _cell_ids(self, coords):
+        return (coords[:, 0] * self.shape[1] + coords[:, 1]) * self.shape[2] + coords[:, 2]
+
+    def _candidates(self, centers, radius):
+        """Return (query_ii, point_ii) for every point in a cell near each center."""
+        # moving a center outside the grid onto its edge only brings it
+        # closer to the cells, so that can't lose any candidates
+        coords = numpy.clip(self._cell_coords(centers), 0, self.shape - 1)
+        reach = int(numpy.ceil(radius / self.cell_size))
+        reach = numpy.minimum(reach, self.shape - 1)
+        query_ii, point_ii = [], []
+        for dx in range(-reach[0], reach[0] + 1):
+            for dy in range(-reach[1], reach[1] + 1):
+                for dz in range(-reach[2], reach[2] + 1):
+                    neighbors = coords + (dx, dy, dz)
+                    inside = numpy.all((neighbors >= 0) & (neighbors < self.shape), axis=1)
+                    queries = numpy.nonzero(inside)[0]
+                    cells = self._cell_ids(neighbors[queries])
+                    # find each cell among the ones with points in them
+                    found = numpy.minimum(numpy.searchsorted(self.cell_ids, cells),
+                                          len(self.cell_ids) - 1)
+                    occupied = self.cell_ids[found] == cells
+                    starts = self.cell_starts[found]
+                    counts = numpy.where(occupied, self.cell_starts[found + 1] - starts, 0)
+                    total = counts.sum()
+                    if not total:
+                        continue
+                    # expand each cell's [start, start+count) range
+                    firsts = numpy.cumsum(counts) - counts
+                    within = numpy.arange(total) - numpy.repeat(firsts, counts)
+                    query_ii.append(numpy.repeat(queries, counts))
+                    point_ii.append(self.order[numpy.repeat(starts, counts) + within])
+        if not query_ii:
+            return numpy.zeros(0, dtype=int), numpy.zeros(0, dtype=int)
+        return numpy.concatenate(query_ii), numpy.concatenate(point_ii)
+
+    def query_radius(self, centers, radius):
+        """Find the points within radius of each of the centers.
+
+        centers: an array of points shaped (n_queries, 3)
+
+        Returns (query_ii, point_ii, distances), three arrays with one entry
+        for each pair of a center and a point within radius of it: the index
+        of the center, the index of the point, and the distance between them.
+
+        """
+        centers = numpy.asarray(centers, dtype=float).reshape(-1, 3)
+        query_ii, point_ii = self._candidates(centers, radius)
+        distances = numpy.sqrt(((self.points[point_ii] - centers[query_ii]) ** 2).sum(axis=1))
+        close = distances <= radius
+        return query_ii[close], point_ii[close], distances[close]
+
+    def query_knn(self, centers, k):
+        """Find the k nearest points to each of the centers.
+
+        centers: an array of points shaped (n_queries, 3)
+
+        Returns (point_ii, distances), two arrays shaped (n_queries, k)
+        holding the indices of the nearest points to each center and their
+        distances, nearest first.
+
+        """
+        centers = numpy.asarray(centers, dtype=float).reshape(-1, 3)
+        if k > len(self.points):
+            raise ValueError('k=%d is more than the %d points in the index' % (k, len(self.points)))
+        n_queries = len(centers)
+        point_ii = numpy.zeros((n_queries, k), dtype=int)
+        distances = numpy.zeros((n_queries, k))
+
+        # search a growing radius until every center has k points within it,
+        # at which point those include its k nearest
+        radius = self.cell_size
+        todo = numpy.arange(n_queries)
+        while len(todo):
+            query_ii, found_ii, found_distances = self.query_radius(centers[todo], radius)
+            counts = numpy.bincount(query_ii, minlength=len(todo))
+            done = counts >= k
+            # sort by query, then by distance, and keep the first k of each done query
+            order = numpy.lexsort((found_distances, query_ii))
+            query_ii, found_ii, found_distances = query_ii[order], found_ii[order], found_distances[order]
+            firsts = numpy.cumsum(counts) - counts
+            rank = numpy.arange(len(query_ii)) - firsts[query_ii]
+            keep = done[query_ii] & (rank < k)
+            rows = todo[query_ii[keep]]
+            point_ii[rows, rank[keep]] = found_ii[keep]
+            distances[rows, rank[keep]] = found_distances[keep]
+            todo = todo[~done]
+            if not len(todo):
+                break
+            # none of the remaining centers has any point closer to it than
+            # the layout's bounding box, so there's no use searching nearer
+            outside = numpy.maximum(self.origin - centers[todo], 0) + \
+                numpy.maximum(centers[todo] - self.points.max(axis=0), 0)
+            radius = max(radius * 2, numpy.sqrt((outside ** 2).sum(axis=1)).min())
+        return point_ii, distances
@@ -21,14 +21,14 @@ from __future__ import division
 import time
 import sys
 import optparse
-import random
-try:
-    import json
-except ImportError:
-    import simplejson as json
 
-import opc 
-import color_utils
+import layout
+import opc
+import parallel
+import profiling
+import scheduler
+import patterns
+import patterns.miami
 
 
 #-------------------------------------------------------------------------------
@@ -44,6 +44,18 @@ parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
 parser.add_option('-f', '--fps', dest='fps', default=20,
                     action='store', type='int',
                     help='frames per second')
+parser.add_option('-g', '--gamma', dest='gamma', default=1,
+                    action='store', type='float',
+                    help='gamma curve to apply.  use 2.2 for live leds, 1 for the simulator')
+parser.add_option('-p', '--processes', dest='processes', default=0,
+                    action='store', type='int',
+                    help='compute the colors one pixel at a time, split across this many processes')
+parser.add_option('-c', '--channel', dest='channel', default=None,
+                    action='store', type='int',
+                    help='channel to send to.  layouts with more pixels than fit in one message '
+                         'go to consecutive channels starting here.  by default, 0 if the '
+                         'layout fits in one message, or 1')
+profiling.add_options(parser)
 
 options, args = parser.parse_args()
 
@@ -62,16 +74,23 @@ print
 print '    parsing layout file'
 print
 
-coordinates = []
-for item in json.load(open(options.layout)):
-    if 'point' in item:
-        coordinates.append(tuple(item['point']))
+coordinates = layout.load(options.layout)
+
+# channel 0 goes to every channel, so layouts which need several channels
+# start at 1 unless told otherwise
+channel = options.channel
+if channel is None:
+    channel = 0 if len(coordinates) <= opc.MAX_PIXELS else 1
 
 
 #-------------------------------------------------------------------------------
 # connect to server
 
+profiler = profiling.from_options(options)
+
 client = opc.Client(options.server)
+client.set_color_correction(gamma=options.gamma)
+client.set_profiler(profiler)
 if client.can_connect():
     print '    connected to %s' % options.server
 else:
@@ -80,115 +99,24 @@ else:
 print
 
 
-#-------------------------------------------------------------------------------
-# color function
-
-def pixel_color(t, coord, ii, n_pixels, random_values):
-    """Compute the color of a given pixel.
-
-    t: time in seconds since the program started.
-    ii: which pixel this is, starting at 0
-    coord: the (x, y, z) position of the pixel as a tuple
-    n_pixels: the total number of pixels
-    random_values: a list containing a constant random value for each pixel
-
-    Returns an (r, g, b) tuple in the range 0-255
-
-    """
-    # make moving stripes for x, y, and z
-    x, y, z = coord
-    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
-    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
-    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
-
-    # rotate
-    x, y, z = y, z, x
-
-#     # shift some of the pixels to a new xyz location
-#     if ii % 17 == 0:
-#         x += ((ii*123)%5) / n_pixels * 32.12 + 0.1
-#         y += ((ii*137)%5) / n_pixels * 22.23 + 0.1
-#         z += ((ii*147)%7) / n_pixels * 44.34 + 0.1
-
-    # make x, y, z -> r, g, b sine waves
-    r = color_utils.cos(x, offset=t / 4, period=2.5, minn=0, maxx=1)
-    g = color_utils.cos(y, offset=t / 4, period=2.5, minn=0, maxx=1)
-    b = color_utils.cos(z, offset=t / 4, period=2.5, minn=0, maxx=1)
-    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.4)
-
-    clampdown = (r + g + b)/2
-    clampdown = color_utils.remap(clampdown, 0.4, 0.5, 0, 1)
-    clampdown = color_utils.clamp(clampdown, 0, 1)
-    clampdown *= 0.9
-    r *= clampdown
-    g *= clampdown
-    b *= clampdown
-
-#     # shift the color of a few outliers
-#     if random_values[ii] < 0.03:
-#         r, g, b = b, g, r
-
-    # black out regions
-    r2 = color_utils.cos(x, offset=t / 10 + 12.345, period=4, minn=0, maxx=1)
-    g2 = color_utils.cos(y, offset=t / 10 + 24.536, period=4, minn=0, maxx=1)
-    b2 = color_utils.cos(z, offset=t / 10 + 34.675, period=4, minn=0, maxx=1)
-    clampdown = (r2 + g2 + b2)/2
-    clampdown = color_utils.remap(clampdown, 0.2, 0.3, 0, 1)
-    clampdown = color_utils.clamp(clampdown, 0, 1)
-    r *= clampdown
-    g *= clampdown
-    b *= clampdown
-
-    # color scheme: fade towards blue-and-orange
-#     g = (r+b) / 2
-    g = g * 0.6 + ((r+b) / 2) * 0.4
-
-#     # stretched vertical smears
-#     v = color_utils.cos(ii / n_pixels, offset=t*0.1, period = 0.07, minn=0, maxx=1) ** 5 * 0.3
-#     r += v
-#     g += v
-#     b += v
-
-    # fade behind twinkle
-    fade = color_utils.cos(t - ii/n_pixels, offset=0, period=7, minn=0, maxx=1) ** 20
-    fade = 1 - fade*0.2
-    r *= fade
-    g *= fade
-    b *= fade
-
-    # twinkle occasional LEDs
-    twinkle_speed = 0.07
-    twinkle_density = 0.1
-    twinkle = (random_values[ii]*7 + time.time()*twinkle_speed) % 1
-    twinkle = abs(twinkle*2 - 1)
-    twinkle = color_utils.remap(twinkle, 0, 1, -1/twinkle_density, 1.1)
-    twinkle = color_utils.clamp(twinkle, -0.5, 1.1)
-    twinkle **= 5
-    twinkle *= color_utils.cos(t - ii/n_pixels, offset=0, period=7, minn=0, maxx=1) ** 20
-    twinkle = color_utils.clamp(twinkle, -0.3, 1)
-    r += twinkle
-    g += twinkle
-    b += twinkle
-
-    # apply gamma curve
-    # only do this on live leds, not in the simulator
-    #r, g, b = color_utils.gamma((r, g, b), 2.2)
-
-    return (r*256, g*256, b*256)
-
-
 #-------------------------------------------------------------------------------
 # send pixels
 
 print '    sending pixels forever (control-c to exit)...'
 print
 
-n_pixels = len(coordinates)
-random_values = [random.random() for ii in range(n_pixels)]
+# the colors are computed for the whole frame at once by patterns/miami.py,
+# or pixel by pixel in worker processes with --processes
+if options.processes:
+    renderer = parallel.PoolRenderer(coordinates, processes=options.processes)
+else:
+    renderer = patterns.Renderer(coordinates)
+frame = opc.PixelBuffer(len(coordinates))
 start_time = time.time()
+frame_scheduler = scheduler.FrameScheduler(options.fps, profiler=profiler)
 while True:
     t = time.time() - start_time
-    pixels = [pixel_color(t*0.6, coord, ii, n_pixels, random_values) for ii, coord in enumerate(coordinates)]
-    client.put_pixels(pixels, channel=0)
-    time.sleep(1 / options.fps)
-
+    with profiler.stage('render'):
+        renderer.frame_colors(patterns.miami, t, out=frame)
+    client.put_pixels(frame, channel=channel)
+    frame_scheduler.wait()
@@ -15,29 +15,434 @@ Recommended use:
 
     # Test if it can connect (optional)
     if client.can_connect():
-        print 'connected to %s' % ADDRESS
+        print('connected to %s' % ADDRESS)
     else:
         # We could exit here, but instead let's just print a warning
         # and then keep trying to send pixels in case the server
         # appears later
-        print 'WARNING: could not connect to %s' % ADDRESS
+        print('WARNING: could not connect to %s' % ADDRESS)
 
     # Send pixels forever at 30 frames per second
     while True:
         my_pixels = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
         if client.put_pixels(my_pixels, channel=0):
-            print '...'
+            print('...')
         else:
-            print 'not connected'
+            print('not connected')
         time.sleep(1/30.0)
 
+To keep a slow server from holding up the animation, use
+opc.PipelinedClient instead, which sends from a background thread and
+drops stale frames rather than queueing them.
+
+With asyncio in Python 3, use opc.AsyncClient, whose put_pixels can be
+awaited.
+
+To avoid building a new list of pixels for every frame, draw each frame
+into the same opc.PixelBuffer and send that:
+
+    frame = opc.PixelBuffer(n_pixels)
+    while True:
+        frame.fill((0, 0, 0))
+        frame[0:10] = (255, 0, 0)
+        client.put_pixels(frame, channel=0)
+
 """
 
+from __future__ import division, print_function
+import array
+import collections
+import errno
+import select
 import socket
+import struct
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# time.monotonic isn't affected by changes to the system clock, but is
+# only available in Python 3
+_clock = getattr(time, 'monotonic', time.time)
+
+# how long to wait before retrying after the first failed connection attempt
+_MIN_BACKOFF = 0.1
+
+# the most pixels which fit in one message, whose length is 16 bits
+MAX_PIXELS = 65535 // 3
+
+
+def _pixel_bytes(pixels):
+    """Convert pixels to a bytes-like object holding r, g, b triplets.
+
+    PixelBuffers and buffers (bytes, bytearray, memoryview, array('B') and
+    uint8 numpy arrays) are converted without any per-pixel Python work.
+    numpy arrays of any other dtype are clamped to 0-255 in bulk.  Anything
+    else is treated as an iterable of (r, g, b) tuples.
+
+    """
+    if isinstance(pixels, PixelBuffer):
+        return pixels.pack()
+    if isinstance(pixels, memoryview) and (pixels.ndim != 1 or pixels.itemsize != 1):
+        return pixels.tobytes()
+    if isinstance(pixels, (bytes, bytearray, memoryview)):
+        return pixels
+    if numpy is not None and isinstance(pixels, numpy.ndarray):
+        if pixels.dtype != numpy.uint8:
+            pixels = numpy.clip(pixels, 0, 255).astype(numpy.uint8)
+        return memoryview(numpy.ascontiguousarray(pixels).reshape(-1))
+    if isinstance(pixels, array.array):
+        if pixels.typecode != 'B':
+            raise ValueError("pixel arrays must have typecode 'B'")
+        if hasattr(pixels, 'tobytes'):
+            return pixels.tobytes()
+        return pixels.tostring()
+    data = bytearray()
+    for r, g, b in pixels:
+        data.append(min(255, max(0, int(r))))
+        data.append(min(255, max(0, int(g))))
+        data.append(min(255, max(0, int(b))))
+    return data
+
+
+def _correction_tables(gamma, brightness, white_balance):
+    """Return a 256-byte translation table for each of r, g, and b.
+
+    Each table maps a 0-255 channel value v to
+    255 * (v/255)**gamma * brightness * white_balance[channel], rounded and
+    clamped to 0-255.
+
+    """
+    tables = []
+    for balance in white_balance:
+        scale = 255 * brightness * balance
+        tables.append(bytes(bytearray(
+            min(255, max(0, int((v / 255) ** gamma * scale + 0.5)))
+            for v in range(256))))
+    return tuple(tables)
+
+
+def _check_strand(start, stop, channel):
+    """Raise ValueError if a strand is too long or short, or its channel doesn't exist."""
+    if not 0 <= stop - start <= MAX_PIXELS:
+        raise ValueError('strands must have from 0 to %d pixels, not %d'
+                         % (MAX_PIXELS, stop - start))
+    if not 0 <= channel <= 255:
+        raise ValueError('channels must be from 0 to 255, not %d' % channel)
+
+
+class PixelBuffer(object):
+
+    __slots__ = ('colors', '_scratch', '_packed', '_packed_colors')
+
+    def __init__(self, n_pixels):
+        """Create a frame of n_pixels black pixels, which can be reused for every frame.
+
+        The colors are kept in self.colors, a float32 numpy array shaped
+        (n_pixels, 3) in the range 0-255.  Indexing and slicing a
+        PixelBuffer reads and writes self.colors, e.g.
+            buffer[0] = (255, 0, 0)
+            buffer[10:20] = other_buffer[0:10]
+        fill, scale and blend change the colors in place, and put_pixels
+        packs them into bytes which are kept with the buffer.  Client
+        builds its messages in a buffer of its own too, unless
+        set_skip_unchanged is on, and patterns.Renderer has patterns write
+        their colors straight into a PixelBuffer.  So in a frame loop which
+        reuses one PixelBuffer, the only memory allocated for each frame is
+        for a pattern's own intermediate arrays, and for the temporary
+        copies color correction makes.
+
+        Needs numpy.
+
+        """
+        if numpy is None:
+            raise ImportError('PixelBuffer needs numpy')
+        self.colors = numpy.zeros((n_pixels, 3), dtype=numpy.float32)
+        self._scratch = numpy.zeros((n_pixels, 3), dtype=numpy.float32)
+        self._packed = bytearray(n_pixels * 3)
+        self._packed_colors = numpy.frombuffer(self._packed, dtype=numpy.uint8).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __getitem__(self, key):
+        return self.colors[key]
+
+    def __setitem__(self, key, value):
+        if isinstance(value, PixelBuffer):
+            value = value.colors
+        self.colors[key] = value
+
+    def fill(self, color):
+        """Set every pixel to the same (r, g, b) color."""
+        self.colors[...] = color
+        return self
+
+    def scale(self, factor):
+        """Multiply the colors by factor, a number or an (r, g, b) tuple of numbers."""
+        self.colors *= factor
+        return self
+
+    def blend(self, other, amount):
+        """Move the colors towards other's by amount, from 0 (no change) to 1 (same as other).
+
+        other: a PixelBuffer or an array of colors of the same size.
+
+        """
+        if isinstance(other, PixelBuffer):
+            other = other.colors
+        numpy.multiply(other, amount, out=self._scratch)
+        self.colors *= 1 - amount
+        self.colors += self._scratch
+        return self
+
+    def pack(self):
+        """Return the colors as a bytearray of r, g, b bytes, clamped to 0-255 and rounded down.
+
+        The bytearray belongs to the buffer and is overwritten by the next
+        call.
+
+        """
+        numpy.clip(self.colors, 0, 255, out=self._scratch)
+        numpy.copyto(self._packed_colors, self._scratch, casting='unsafe')
+        return self._packed
+
+
+class BaseClient(object):
+
+    def __init__(self, server_ip_port, long_connection=True, verbose=False,
+                 connect_timeout=1.0, max_backoff=5.0):
+        """Set up the parts of a client which don't depend on how it sends.
 
-class Client(object):
+        The arguments are the same as for Client.  Client and AsyncClient
+        both build on this: it keeps the server's address, the backoff
+        between connection attempts, color correction, skipping unchanged
+        pixels and strands, and turns pixels into OPC messages.  Sending
+        them is up to each kind of client.
+
+        """
+        self.verbose = verbose
+
+        self._long_connection = long_connection
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+
+        self._ip, self._port = server_ip_port.split(':')
+        self._port = int(self._port)
+
+        # when we may try connecting again after a failure, and how long to
+        # wait after the next failure
+        self._next_connect_time = 0
+        self._backoff = _MIN_BACKOFF
+
+        # (gamma, brightness, white_balance) and the tables built from them.
+        # tables is None when no color correction is needed.
+        self._correction = ((1, 1, (1, 1, 1)), None)
+
+        # for skipping unchanged pixels: the last message sent on each
+        # channel and when it was sent
+        self._skip_unchanged = False
+        self._keepalive = None
+        self._last_sent = {}  # channel -> (message, time)
+        self.skipped = 0
+
+        # (start, stop, channel) for each strand to split frames into, or
+        # None to only split frames which are too big for one message
+        self._strands = None
+
+        # a profiling.Profiler to time packing, color correction and
+        # sending with, or None
+        self._profiler = None
+
+    def _debug(self, m):
+        if self.verbose:
+            print('    %s' % str(m))
+
+    def set_color_correction(self, gamma=1, brightness=1, white_balance=(1, 1, 1)):
+        """Correct the colors of all pixels sent from now on.
+
+        gamma: a gamma curve to apply to each channel, e.g. 2.2 for live LEDs.
+        brightness: a float to scale all values by, e.g. 0.5 for half brightness.
+        white_balance: an (r, g, b) tuple of floats to scale each channel by.
+
+        The correction is applied to each frame in bulk right before it is
+        sent, using a lookup table per channel.  The tables are only rebuilt
+        when these parameters change, so this is cheap to call every frame.
+        Values are rounded down to integers before correction.
+
+        """
+        params = (gamma, brightness, tuple(white_balance))
+        if params == self._correction[0]:
+            return
+        if params == (1, 1, (1, 1, 1)):
+            tables = None
+        else:
+            self._debug('set_color_correction: building tables')
+            tables = _correction_tables(gamma, brightness, white_balance)
+        self._correction = (params, tables)
 
-    def __init__(self, server_ip_port, long_connection=True, verbose=False):
+    def set_skip_unchanged(self, skip=True, keepalive=1.0):
+        """Don't send pixels which are the same as those last sent on their channel.
+
+        This saves bandwidth, and work for the server, when the pixels
+        don't change often.  Skipped calls to put_pixels return True and
+        are counted in self.skipped.
+
+        keepalive: send unchanged pixels anyway if they were last sent this
+            many seconds ago, in case the server lost them, e.g. because it
+            restarted.  None to never send them again.
+
+        After a failure to send, the next pixels on each channel are always
+        sent.  Pixels sent to channel 0 replace those of every channel.
+
+        """
+        self._skip_unchanged = skip
+        self._keepalive = keepalive
+        self._forget_sent()
+
+    def set_strands(self, strands):
+        """Split each frame given to put_pixels into strands on different channels.
+
+        strands: a list of (start, stop, channel) tuples.  Pixels start to
+            stop-1 of each frame are sent to the given channel, e.g. for
+            three strands of 20000 pixels:
+                [(0, 20000, 1), (20000, 40000, 2), (40000, 60000, 3)]
+            Each strand can have up to MAX_PIXELS pixels.  None to stop
+            splitting frames.
+
+        While strands are set, the channel given to put_pixels is ignored.
+        All the strands are sent with a single write, like put_frames.
+
+        Without strands, frames of more than MAX_PIXELS pixels, which don't
+        fit in one OPC message, are split into strands of MAX_PIXELS pixels
+        on consecutive channels, starting at the channel given to put_pixels.
+
+        """
+        if strands is not None:
+            strands = [(int(start), int(stop), int(channel)) for start, stop, channel in strands]
+            for start, stop, channel in strands:
+                _check_strand(start, stop, channel)
+        self._strands = strands
+
+    def set_profiler(self, profiler):
+        """Time the pack, correct and send stages of each frame with a profiling.Profiler.
+
+        None to stop timing them.  PipelinedClient and AsyncClient only
+        time packing and color correction, since the sending isn't part of
+        put_pixels.
+
+        """
+        self._profiler = profiler
+
+    def _split(self, pixels, channel):
+        """Convert pixels for put_pixels to bytes, and split them into strands if needed.
+
+        Returns (data, frames), where frames is a list of (channel, data)
+        pairs for put_frames, or None if the data can be sent as one message
+        on the channel.
+
+        """
+        profiler = self._profiler
+        if profiler is None:
+            data = _pixel_bytes(pixels)
+        else:
+            with profiler.stage('pack'):
+                data = _pixel_bytes(pixels)
+        if self._strands is None and len(data) <= MAX_PIXELS * 3:
+            return data, None
+        view = memoryview(data)
+        if self._strands is not None:
+            return data, [(ch, view[start*3:stop*3]) for start, stop, ch in self._strands]
+        size = MAX_PIXELS * 3
+        n_strands = -(-len(view) // size)
+        if channel == 0:
+            raise ValueError('%d pixels need more than one channel, so they can not be sent '
+                             'to channel 0.  use set_strands to say where to send them'
+                             % (len(view) // 3))
+        if channel + n_strands - 1 > 255:
+            raise ValueError('%d pixels need channels %d to %d, but the last channel is 255.  '
+                             'use set_strands to say where to send them'
+                             % (len(view) // 3, channel, channel + n_strands - 1))
+        return data, [(channel + ii, view[ii*size:(ii + 1)*size]) for ii in range(n_strands)]
+
+    def _unchanged(self, channel, message):
+        """Return True if the message can be skipped, or else remember it as sent."""
+        now = _clock()
+        last = self._last_sent.get(channel)
+        if last is not None and last[0] == message and \
+                (self._keepalive is None or now - last[1] < self._keepalive):
+            self.skipped += 1
+            return True
+        if channel == 0:
+            # these pixels go to every channel
+            self._last_sent.clear()
+        else:
+            self._last_sent.pop(0, None)
+        self._last_sent[channel] = (message, now)
+        return False
+
+    def _forget_sent(self):
+        """Make sure the next pixels on every channel are sent."""
+        self._last_sent.clear()
+
+    def _build_messages(self, frames):
+        """Return the OPC messages for put_frames joined into one bytearray.
+
+        Messages which are skipped because they're unchanged are left out.
+
+        """
+        if hasattr(frames, 'items'):
+            frames = frames.items()
+        messages = []
+        for channel, pixels in frames:
+            message = self._build_message(pixels, channel)
+            if self._skip_unchanged and self._unchanged(channel, message):
+                continue
+            messages.append(message)
+        return bytearray().join(messages)
+
+    def _build_message(self, pixels, channel, buffer=None):
+        """Return the OPC message for put_pixels as a bytearray.
+
+        buffer: an optional bytearray to build the message in, instead of
+            a new one.  It's resized to fit if needed.
+
+        """
+        profiler = self._profiler
+        if profiler is not None:
+            start = profiler.clock()
+        data = _pixel_bytes(pixels)
+        if len(data) > MAX_PIXELS * 3:
+            raise ValueError('%d pixels do not fit in one message, the most is %d'
+                             % (len(data) // 3, MAX_PIXELS))
+        if buffer is None:
+            message = bytearray(struct.pack('>BBH', channel, 0, len(data)))
+            message += data
+        else:
+            message = buffer
+            struct.pack_into('>BBH', message, 0, channel, 0, len(data))
+            message[4:] = data
+        if profiler is not None:
+            now = profiler.clock()
+            profiler.add('pack', now - start)
+            start = now
+        tables = self._correction[1]
+        if tables is not None:
+            for ii, table in enumerate(tables):
+                message[4+ii::3] = message[4+ii::3].translate(table)
+            if profiler is not None:
+                profiler.add('correct', profiler.clock() - start)
+        return message
+
+
+class Client(BaseClient):
+
+    def __init__(self, server_ip_port, long_connection=True, verbose=False,
+                 connect_timeout=1.0, max_backoff=5.0):
         """Create an OPC client object which sends pixels to an OPC server.
 
         server_ip_port should be an ip:port or hostname:port as a single string.
@@ -56,42 +461,101 @@ class Client(object):
         A connection is not established during __init__.  To check if a
         connection will succeed, use can_connect().
 
+        Connecting never holds up put_pixels in long connection mode.  The
+        connection is made in the background using a non-blocking socket,
+        and put_pixels returns False right away until it succeeds.  If it
+        doesn't succeed within connect_timeout seconds, the next attempt is
+        put off for a while, starting at 0.1 seconds and doubling after each
+        failure up to max_backoff seconds.  In short connection mode,
+        put_pixels waits up to connect_timeout seconds for each connection,
+        but still backs off after failures.
+
         If verbose is True, the client will print debugging info to the console.
 
         """
-        self.verbose = verbose
-
-        self._long_connection = long_connection
-
-        self._ip, self._port = server_ip_port.split(':')
-        self._port = int(self._port)
+        BaseClient.__init__(self, server_ip_port, long_connection, verbose,
+                            connect_timeout, max_backoff)
 
         self._socket = None  # will be None when we're not connected
 
-    def _debug(self, m):
-        if self.verbose:
-            print '    %s' % str(m)
+        # a socket which is still connecting, or None, and when to give up on it
+        self._connecting_socket = None
+        self._connect_deadline = 0
 
-    def _ensure_connected(self):
+        # put_pixels builds its messages in here, unless it needs to keep them
+        self._message = bytearray(4)
+
+    def _ensure_connected(self, wait=0):
         """Set up a connection if one doesn't already exist.
 
-        Return True on success or False on failure.
+        wait: how many seconds to wait for a connection in progress.
+
+        Return True on success or False on failure, or if still connecting.
 
         """
         if self._socket:
             self._debug('_ensure_connected: already connected, doing nothing')
             return True
 
-        try:
+        now = _clock()
+        if self._connecting_socket is None:
+            if now < self._next_connect_time:
+                self._debug('_ensure_connected: waiting to retry')
+                return False
             self._debug('_ensure_connected: trying to connect...')
-            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._socket.connect((self._ip, self._port))
+            sock = None  # stays None if a socket can't be created, e.g. with EMFILE
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                err = sock.connect_ex((self._ip, self._port))
+            except socket.error:
+                err = -1
+            if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                return self._connect_failed(sock)
+            self._connecting_socket = sock
+            self._connect_deadline = now + self.connect_timeout
+
+        sock = self._connecting_socket
+        wait = max(0, min(wait, self._connect_deadline - now))
+        _, writable, _ = select.select([], [sock], [], wait)
+        if writable:
+            if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+                return self._connect_failed(sock)
             self._debug('_ensure_connected:    ...success')
+            sock.setblocking(True)
+            # frames are written whole, so there's nothing to gain by
+            # waiting to fill up packets
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._socket = sock
+            self._connecting_socket = None
+            self._backoff = _MIN_BACKOFF
             return True
-        except socket.error:
-            self._debug('_ensure_connected:    ...failure')
-            self._socket = None
-            return False
+        if _clock() >= self._connect_deadline:
+            return self._connect_failed(sock)
+        self._debug('_ensure_connected:    ...still connecting')
+        return False
+
+    def _connect_failed(self, sock):
+        """Give up on a connection attempt and schedule the next one.
+
+        sock: the socket which was connecting, or None if there wasn't one.
+
+        Return False.
+
+        """
+        self._debug('_ensure_connected:    ...failure, retrying in %s seconds' % self._backoff)
+        if sock is not None:
+            sock.close()
+        self._connecting_socket = None
+        self._next_connect_time = _clock() + self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+        return False
+
+    def _connect_wait(self):
+        """How long put_pixels should wait for a connection in progress."""
+        if self._long_connection:
+            return 0
+        return self.connect_timeout
 
     def disconnect(self):
         """Drop the connection to the server, if there is one."""
@@ -99,6 +563,9 @@ class Client(object):
         if self._socket:
             self._socket.close()
         self._socket = None
+        if self._connecting_socket:
+            self._connecting_socket.close()
+        self._connecting_socket = None
 
     def can_connect(self):
         """Try to connect to the server.
@@ -108,8 +575,12 @@ class Client(object):
         If in long connection mode, this connection will be kept and re-used for
         subsequent put_pixels calls.
 
+        Waits up to connect_timeout seconds, even if backing off after an
+        earlier failure.
+
         """
-        success = self._ensure_connected()
+        self._next_connect_time = 0
+        success = self._ensure_connected(wait=self.connect_timeout)
         if not self._long_connection:
             self.disconnect()
         return success
@@ -127,6 +598,14 @@ class Client(object):
             Floats will be rounded down to integers.
             Values outside the legal range will be clamped.
 
+            pixels can also be a PixelBuffer, or a buffer of r, g, b bytes:
+            bytes, bytearray, memoryview, array('B'), or a numpy array
+            shaped (n, 3).
+            These are sent without any per-pixel work.  numpy arrays that
+            aren't uint8 are clamped to 0-255 and rounded down in bulk.
+
+        Any color correction set with set_color_correction is applied.
+
         Will establish a connection to the server as needed.
 
         On successful transmission of pixels, return True.
@@ -136,31 +615,73 @@ class Client(object):
         with the first LED.  It's not possible to send a color just to one
         LED at a time (unless it's the first one).
 
+        If set_skip_unchanged was called, pixels which are the same as the
+        last ones sent on the channel aren't sent again.
+
+        Frames of more than MAX_PIXELS pixels are split across several
+        channels; see set_strands.
+
+        """
+        data, frames = self._split(pixels, channel)
+        if frames is not None:
+            return self.put_frames(frames)
+        if not self._skip_unchanged:
+            # the message isn't kept after it's sent, so its memory can be reused
+            return self._send_timed(self._build_message(data, channel, self._message))
+        message = self._build_message(data, channel)
+        if self._unchanged(channel, message):
+            return True
+        return self._send_timed(message)
+
+    def put_frames(self, frames):
+        """Send pixels to several channels at once.
+
+        frames: a dict mapping channels to pixels, or a list of
+            (channel, pixels) pairs to send them in that order.  The pixels
+            can be in any of the forms put_pixels takes.
+
+        The messages for all the channels are put in one buffer and sent
+        with a single write, so sending many strands costs about the same
+        as sending one big one.
+
+        On successful transmission of pixels, return True.
+        On failure (bad connection), return False.
+
+        """
+        message = self._build_messages(frames)
+        if not message:
+            return True
+        return self._send_timed(message)
+
+    def _send_timed(self, message):
+        """Send a message with _send_message, timing it if there's a profiler."""
+        profiler = self._profiler
+        if profiler is None:
+            return self._send_message(message)
+        with profiler.stage('send'):
+            return self._send_message(message)
+
+    def _send_message(self, message):
+        """Send a complete OPC message, connecting first if needed.
+
+        Return True on success or False on failure.
+
         """
         self._debug('put_pixels: connecting')
-        is_connected = self._ensure_connected()
+        is_connected = self._ensure_connected(wait=self._connect_wait())
         if not is_connected:
             self._debug('put_pixels: not connected.  ignoring these pixels.')
+            self._forget_sent()
             return False
 
-        # build OPC message
-        len_hi_byte = int(len(pixels)*3 / 256)
-        len_lo_byte = (len(pixels)*3) % 256
-        header = chr(channel) + chr(0) + chr(len_hi_byte) + chr(len_lo_byte)
-        pieces = [header]
-        for r, g, b in pixels:
-            r = min(255, max(0, int(r)))
-            g = min(255, max(0, int(g)))
-            b = min(255, max(0, int(b)))
-            pieces.append(chr(r) + chr(g) + chr(b))
-        message = ''.join(pieces)
-
         self._debug('put_pixels: sending pixels to server')
         try:
-            self._socket.send(message)
+            self._socket.sendall(message)
         except socket.error:
             self._debug('put_pixels: connection lost.  could not send pixels.')
+            self._socket.close()
             self._socket = None
+            self._forget_sent()
             return False
 
         if not self._long_connection:
@@ -170,3 +691,305 @@ class Client(object):
         return True
 
 
+class PipelinedClient(Client):
+
+    def __init__(self, server_ip_port, long_connection=True, verbose=False,
+                 connect_timeout=1.0, max_backoff=5.0):
+        """Create an OPC client which sends pixels from a background thread.
+
+        This works like Client, except that put_pixels never waits for the
+        network.  It packs the pixels into a message and hands it to a
+        sender thread, then returns right away.  This keeps a slow or
+        stalled server from holding up the animation.
+
+        Only the latest message for each channel is kept: if put_pixels is
+        called again for a channel before the sender thread got around to
+        sending the previous pixels, those stale pixels are dropped instead
+        of queued.  The number of dropped messages is counted in
+        self.dropped.
+
+        Call close() to stop the sender thread.
+
+        """
+        Client.__init__(self, server_ip_port, long_connection, verbose,
+                        connect_timeout, max_backoff)
+        self.dropped = 0
+        self._last_send_ok = False
+
+        # the messages waiting to be sent, keyed by channel, and a condition
+        # which is notified when one is added
+        self._pending = collections.OrderedDict()
+        self._pending_condition = threading.Condition()
+        # held while using the socket, which both threads can do
+        self._socket_lock = threading.RLock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run_sender)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def can_connect(self):
+        with self._socket_lock:
+            return Client.can_connect(self)
+
+    def _connect_wait(self):
+        # the sender thread can afford to wait for the connection
+        return self.connect_timeout
+
+    def disconnect(self):
+        with self._socket_lock:
+            Client.disconnect(self)
+
+    def _send_message(self, message):
+        # the sender thread isn't the only one which sends, e.g.
+        # recording.Player sends its messages straight to the client
+        with self._socket_lock:
+            return Client._send_message(self, message)
+
+    def put_pixels(self, pixels, channel=0):
+        """Hand the pixels to the sender thread to be sent to the OPC server.
+
+        Arguments are the same as for Client.put_pixels.
+
+        Doesn't wait for the pixels to be sent.  Returns True if the last
+        message the sender thread sent was successful, or False if it
+        couldn't connect or the connection was lost.
+
+        """
+        data, frames = self._split(pixels, channel)
+        if frames is not None:
+            return self.put_frames(frames)
+        message = self._build_message(data, channel)
+        if self._skip_unchanged and self._unchanged(channel, message):
+            return True
+        with self._pending_condition:
+            if self._closed:
+                raise ValueError('put_pixels called after close()')
+            if channel in self._pending:
+                self.dropped += 1
+                del self._pending[channel]
+            self._pending[channel] = message
+            self._pending_condition.notify()
+        return self._last_send_ok
+
+    def put_frames(self, frames):
+        """Hand pixels for several channels to the sender thread at once.
+
+        Arguments are the same as for Client.put_frames.  The sender thread
+        sends everything waiting with a single write.
+
+        Doesn't wait for the pixels to be sent.  Returns the same as
+        put_pixels.
+
+        """
+        if hasattr(frames, 'items'):
+            frames = frames.items()
+        messages = []
+        for channel, pixels in frames:
+            message = self._build_message(pixels, channel)
+            if not (self._skip_unchanged and self._unchanged(channel, message)):
+                messages.append((channel, message))
+        with self._pending_condition:
+            if self._closed:
+                raise ValueError('put_frames called after close()')
+            for channel, message in messages:
+                if channel in self._pending:
+                    self.dropped += 1
+                    del self._pending[channel]
+                self._pending[channel] = message
+            self._pending_condition.notify()
+        return self._last_send_ok
+
+    def close(self):
+        """Send any pixels still waiting, then stop the sender thread and disconnect."""
+        with self._pending_condition:
+            self._closed = True
+            self._pending_condition.notify()
+        self._thread.join()
+        self.disconnect()
+
+    def _run_sender(self):
+        while True:
+            with self._pending_condition:
+                while not self._pending and not self._closed:
+                    self._pending_condition.wait()
+                if not self._pending:
+                    return
+                # send everything waiting in one go
+                messages = list(self._pending.values())
+                self._pending.clear()
+            self._last_send_ok = self._send_message(bytearray().join(messages))
+
+
+class FanoutClient(object):
+
+    def __init__(self, strands, verbose=False, connect_timeout=1.0,
+                 max_backoff=5.0, send_timeout=1.0):
+        """Create a client which splits each frame across several OPC servers.
+
+        strands: a list of (start, stop, server_ip_port, channel) tuples.
+            Pixels start to stop-1 of each frame are sent to the given
+            channel on the given server.  For example, for two boards with
+            two strands of 100 pixels each:
+                [(0, 100, '10.0.0.2:7890', 1),
+                 (100, 200, '10.0.0.2:7890', 2),
+                 (200, 300, '10.0.0.3:7890', 1),
+                 (300, 400, '10.0.0.3:7890', 2)]
+            Each strand can have up to MAX_PIXELS pixels, as for
+            Client.set_strands.
+
+        One long connection is kept to each server, using a Client per
+        server; verbose, connect_timeout and max_backoff are passed on to
+        them.  The messages for all the servers are written at the same
+        time, so a frame takes as long as the slowest server rather than
+        the sum of all of them.  A server which can't take its messages
+        within send_timeout seconds is disconnected, since it would
+        otherwise be left with half a message.
+
+        """
+        self.verbose = verbose
+        self.send_timeout = send_timeout
+        self._profiler = None
+        self._strands = []
+        self._clients = collections.OrderedDict()  # server_ip_port -> Client
+        for start, stop, server_ip_port, channel in strands:
+            start, stop, channel = int(start), int(stop), int(channel)
+            _check_strand(start, stop, channel)
+            if server_ip_port not in self._clients:
+                self._clients[server_ip_port] = Client(
+                    server_ip_port, verbose=verbose,
+                    connect_timeout=connect_timeout, max_backoff=max_backoff)
+            self._strands.append((start, stop, self._clients[server_ip_port], channel))
+
+    def _debug(self, m):
+        if self.verbose:
+            print('    %s' % str(m))
+
+    def can_connect(self):
+        """Try to connect to all the servers.
+
+        Return True if all of them succeeded, False otherwise.
+
+        """
+        results = [client.can_connect() for client in self._clients.values()]
+        return all(results)
+
+    def disconnect(self):
+        """Drop the connections to all the servers."""
+        for client in self._clients.values():
+            client.disconnect()
+
+    def set_color_correction(self, gamma=1, brightness=1, white_balance=(1, 1, 1)):
+        """Correct the colors of all pixels sent from now on, on every server.
+
+        See Client.set_color_correction.
+
+        """
+        for client in self._clients.values():
+            client.set_color_correction(gamma, brightness, white_balance)
+
+    def set_skip_unchanged(self, skip=True, keepalive=1.0):
+        """Don't send strands whose pixels are the same as last time.
+
+        See Client.set_skip_unchanged.  The number of strands skipped is
+        counted in self.skipped.
+
+        """
+        for client in self._clients.values():
+            client.set_skip_unchanged(skip, keepalive)
+
+    @property
+    def skipped(self):
+        return sum(client.skipped for client in self._clients.values())
+
+    def set_profiler(self, profiler):
+        """Time the pack, correct and send stages of each frame with a profiling.Profiler.
+
+        See Client.set_profiler.  The send stage covers writing to all the
+        servers.
+
+        """
+        self._profiler = profiler
+        for client in self._clients.values():
+            client.set_profiler(profiler)
+
+    def put_pixels(self, pixels):
+        """Split the pixel colors into strands and send each to its server.
+
+        pixels: the whole frame, in any of the forms Client.put_pixels takes.
+
+        Return True if every server got its pixels, False otherwise.
+        Servers which aren't connected are skipped without waiting, and
+        reconnected in the background like Client does.
+
+        """
+        profiler = self._profiler
+        if profiler is None:
+            data = memoryview(_pixel_bytes(pixels))
+        else:
+            with profiler.stage('pack'):
+                data = memoryview(_pixel_bytes(pixels))
+
+        # build all the messages for each connected server
+        messages = collections.OrderedDict()
+        connected = set()
+        for start, stop, client, channel in self._strands:
+            if not client._ensure_connected():
+                client._forget_sent()
+                continue
+            connected.add(client)
+            message = client._build_message(data[start*3:stop*3], channel)
+            if client._skip_unchanged and client._unchanged(channel, message):
+                continue
+            messages.setdefault(client, bytearray()).extend(message)
+        success = len(connected) == len(self._clients)
+
+        # write to all of them at once
+        if profiler is not None:
+            start_send = profiler.clock()
+        pending = {}  # socket -> (client, the part of the message still to send)
+        for client, message in messages.items():
+            client._socket.setblocking(False)
+            pending[client._socket] = (client, memoryview(message))
+        deadline = _clock() + self.send_timeout
+        while pending:
+            wait = deadline - _clock()
+            if wait <= 0:
+                break
+            _, writable, _ = select.select([], list(pending), [], wait)
+            for sock in writable:
+                client, view = pending[sock]
+                try:
+                    sent = sock.send(view)
+                except socket.error as e:
+                    if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        continue
+                    self._debug('put_pixels: connection to %s:%s lost' % (client._ip, client._port))
+                    client.disconnect()
+                    client._forget_sent()
+                    del pending[sock]
+                    success = False
+                    continue
+                if sent == len(view):
+                    sock.setblocking(True)
+                    del pending[sock]
+                else:
+                    pending[sock] = (client, view[sent:])
+
+        for client, view in pending.values():
+            self._debug('put_pixels: %s:%s is too slow, disconnecting' % (client._ip, client._port))
+            client.disconnect()
+            client._forget_sent()
+            success = False
+
+        if profiler is not None:
+            profiler.add('send', profiler.clock() - start_send)
+        return success
+
+
+def __getattr__(name):
+    # AsyncClient lives in its own module because it needs Python 3's asyncio
+    if name == 'AsyncClient':
+        from opc_asyncio import AsyncClient
+        return AsyncClient
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+"""asyncio client for Open Pixel Control.  Needs Python 3.
+
+Use this instead of opc.Client to drive one or more OPC servers from a
+single asyncio event loop, without a thread per server.  It's also
+available as opc.AsyncClient.
+
+Recommended use:
+
+    import asyncio
+    import opc
+
+    async def main():
+        client = opc.AsyncClient('localhost:7890')
+        if not await client.can_connect():
+            print('WARNING: could not connect')
+        while True:
+            my_pixels = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+            await client.put_pixels(my_pixels, channel=0)
+            await asyncio.sleep(1/30.0)
+
+    asyncio.run(main())
+
+"""
+
+import asyncio
+
+import opc
+
+
+class AsyncClient(opc.BaseClient):
+
+    def __init__(self, server_ip_port, long_connection=True, verbose=False,
+                 connect_timeout=1.0, max_backoff=5.0, max_buffer=65536):
+        """Create an OPC client object which sends pixels using asyncio streams.
+
+        server_ip_port, long_connection, verbose, connect_timeout and
+        max_backoff work as for opc.Client.
+
+        max_buffer: how many bytes may be waiting in the connection's write
+            buffer.  If more than this are waiting because the server isn't
+            keeping up, new pixels are dropped instead of buffered, and
+            counted in self.dropped.
+
+        In long connection mode, put_pixels never waits for a connection.
+        If there isn't one, it starts connecting in the background and drops
+        the pixels until the connection is made, backing off after failed
+        attempts like opc.Client does.
+
+        """
+        opc.BaseClient.__init__(self, server_ip_port, long_connection, verbose,
+                                connect_timeout, max_backoff)
+        self.max_buffer = max_buffer
+        self.dropped = 0
+
+        self._writer = None          # will be None when we're not connected
+        self._connect_task = None    # will be None unless we're connecting
+
+    def _is_connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self):
+        """Set up a connection if one doesn't already exist.
+
+        Return True on success or False on failure.
+
+        """
+        if self._is_connected():
+            self._debug('_ensure_connected: already connected, doing nothing')
+            return True
+
+        try:
+            self._debug('_ensure_connected: trying to connect...')
+            reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self._ip, self._port),
+                self.connect_timeout)
+            self._debug('_ensure_connected:    ...success')
+            self._backoff = opc._MIN_BACKOFF
+            return True
+        except (OSError, asyncio.TimeoutError):
+            self._debug('_ensure_connected:    ...failure, retrying in %s seconds' % self._backoff)
+            self._writer = None
+            self._next_connect_time = opc._clock() + self._backoff
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            return False
+
+    def _start_connecting(self):
+        """Start connecting in the background, unless we already are or are backing off."""
+        if self._connect_task is not None and not self._connect_task.done():
+            return
+        if opc._clock() < self._next_connect_time:
+            self._debug('_start_connecting: waiting to retry')
+            return
+        self._connect_task = asyncio.ensure_future(self._ensure_connected())
+
+    def disconnect(self):
+        """Drop the connection to the server, if there is one."""
+        self._debug('disconnecting')
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+    async def can_connect(self):
+        """Try to connect to the server.
+
+        Return True on success or False on failure.
+
+        If in long connection mode, this connection will be kept and re-used for
+        subsequent put_pixels calls.
+
+        """
+        success = await self._ensure_connected()
+        if not self._long_connection:
+            self.disconnect()
+        return success
+
+    async def put_pixels(self, pixels, channel=0):
+        """Send the list of pixel colors to the OPC server on the given channel.
+
+        Arguments are the same as for opc.Client.put_pixels.
+
+        On successful transmission of pixels, return True.
+        On failure (not connected, or the server isn't keeping up), return False.
+
+        """
+        data, frames = self._split(pixels, channel)
+        if frames is not None:
+            return await self.put_frames(frames)
+        message = self._build_message(data, channel)
+        if self._skip_unchanged and self._unchanged(channel, message):
+            return True
+        return await self._send_message(message)
+
+    async def put_frames(self, frames):
+        """Send pixels to several channels with a single write.
+
+        Arguments are the same as for opc.Client.put_frames.
+
+        On successful transmission of pixels, return True.
+        On failure (not connected, or the server isn't keeping up), return False.
+
+        """
+        message = self._build_messages(frames)
+        if not message:
+            return True
+        return await self._send_message(message)
+
+    async def _send_message(self, message):
+        """Send a complete OPC message, or several joined together.
+
+        Return True on success or False on failure.
+
+        """
+        if not self._long_connection:
+            if not await self._ensure_connected():
+                self._debug('put_pixels: not connected.  ignoring these pixels.')
+                self._forget_sent()
+                return False
+            try:
+                self._writer.write(message)
+                await self._writer.drain()
+            except OSError:
+                self._debug('put_pixels: connection lost.  could not send pixels.')
+                self._forget_sent()
+                return False
+            finally:
+                self._debug('put_pixels: disconnecting')
+                self.disconnect()
+            return True
+
+        if not self._is_connected():
+            self._debug('put_pixels: not connected.  ignoring these pixels.')
+            self._writer = None
+            self._forget_sent()
+            self._start_connecting()
+            return False
+
+        if self._writer.transport.get_write_buffer_size() > self.max_buffer:
+            self._debug('put_pixels: server is behind.  dropping these pixels.')
+            self.dropped += 1
+            self._forget_sent()
+            return False
+
+        self._debug('put_pixels: sending pixels to server')
+        self._writer.write(message)
+        return True
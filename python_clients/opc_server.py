@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+"""asyncio server for Open Pixel Control.  Needs Python 3.
+
+Receives OPC messages from any number of clients at once and passes each
+one to a handler function.  Use it as a local server for testing, or to
+record or forward what clients send.
+
+Each connection reads into its own buffer, which is reused for every read.
+All the complete messages in a read are handled right away, and the
+handler is given a memoryview of each message's data in the buffer rather
+than a copy.  That memoryview is only valid until the handler returns, so
+copy it (e.g. with bytes()) to keep it.
+
+Recommended use:
+
+    import asyncio
+    import opc_server
+
+    def handler(channel, command, data):
+        # data is a memoryview of r, g, b bytes for command 0 (set pixels)
+        print(channel, command, len(data) // 3)
+
+    async def main():
+        server = opc_server.Server(handler, port=7890)
+        await server.start()
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+To just print what clients send, like bin/dummy_server:
+
+    python_clients/opc_server.py [port]
+
+"""
+
+import asyncio
+import sys
+
+DEFAULT_PORT = 7890
+
+# the largest possible message: a 4 byte header and up to 65535 bytes of data
+MAX_MESSAGE_SIZE = 4 + 65535
+
+
+class _Connection(asyncio.BufferedProtocol):
+
+    def __init__(self, server):
+        self._server = server
+        # room for a full message that's still arriving, plus plenty more
+        self._buffer = bytearray(server.buffer_size)
+        self._view = memoryview(self._buffer)
+        self._length = 0  # how many bytes of the buffer hold data
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._server._connections.add(self)
+        self._server._debug('client connected from %s' % (transport.get_extra_info('peername'),))
+
+    def connection_lost(self, exc):
+        self._server._connections.discard(self)
+        self._server._debug('client closed connection')
+
+    def get_buffer(self, sizehint):
+        return self._view[self._length:]
+
+    def buffer_updated(self, nbytes):
+        self._length += nbytes
+        view = self._view
+        handler = self._server.handler
+        start = 0
+        # handle every complete message in the buffer
+        while self._length - start >= 4:
+            data_length = (view[start + 2] << 8) | view[start + 3]
+            end = start + 4 + data_length
+            if end > self._length:
+                break
+            self._server.messages += 1
+            handler(view[start], view[start + 1], view[start + 4:end])
+            start = end
+        self._server.bytes_received += nbytes
+        # move the start of the next message to the front of the buffer
+        if start:
+            remaining = self._length - start
+            view[:remaining] = view[start:self._length]
+            self._length = remaining
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+
+class Server(object):
+
+    def __init__(self, handler, host='0.0.0.0', port=DEFAULT_PORT,
+                 buffer_size=4 * MAX_MESSAGE_SIZE, verbose=False):
+        """Create an OPC server which passes each message it receives to handler.
+
+        handler: a function called as handler(channel, command, data) for
+            each message, where data is a memoryview of the message's data.
+            It's called from the event loop, so it shouldn't block.
+        host, port: the address to listen on.  If port is 0, a free port is
+            chosen; self.port says which after start().
+        buffer_size: how many bytes to read at most at a time for each
+            connection.  It must hold at least one message of the largest
+            possible size.
+        verbose: print connections and disconnections to stderr.
+
+        self.messages and self.bytes_received count what all clients have
+        sent so far.
+
+        """
+        if buffer_size < MAX_MESSAGE_SIZE:
+            raise ValueError('buffer_size must be at least %d' % MAX_MESSAGE_SIZE)
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.verbose = verbose
+
+        self.messages = 0
+        self.bytes_received = 0
+
+        self._server = None  # will be None until start() is called
+        self._connections = set()
+
+    def _debug(self, m):
+        if self.verbose:
+            print('    %s' % str(m), file=sys.stderr)
+
+    @property
+    def clients(self):
+        """The number of clients connected right now."""
+        return len(self._connections)
+
+    async def start(self):
+        """Start listening for clients."""
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _Connection(self), self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._debug('listening on port %d' % self.port)
+
+    async def serve_forever(self):
+        """Serve clients until the server is closed."""
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    def close(self):
+        """Stop listening and close all the connections."""
+        if self._server is not None:
+            self._server.close()
+        for connection in list(self._connections):
+            connection.close()
+
+    async def wait_closed(self):
+        if self._server is not None:
+            await self._server.wait_closed()
+
+
+#-------------------------------------------------------------------------------
+# print what clients send
+
+def print_handler(channel, command, data):
+    count = len(data) // 3
+    line = '-> channel %d: %d pixel%s' % (channel, count, '' if count == 1 else 's')
+    if command != 0:
+        line = '-> channel %d: command %d with %d bytes' % (channel, command, len(data))
+    else:
+        pixels = ['%02x %02x %02x' % tuple(data[ii*3:ii*3 + 3]) for ii in range(min(count, 4))]
+        if pixels:
+            line += ' = ' + ', '.join(pixels)
+        if count > 4:
+            line += ', ...'
+    print(line)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    server = Server(print_handler, port=port, verbose=True)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
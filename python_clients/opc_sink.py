@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""An OPC server which throws away everything sent to it.
+
+Use it to measure how fast a client can send, without a real server's
+speed getting in the way.
+
+Recommended use:
+
+    import opc
+    import opc_sink
+
+    sink = opc_sink.NullSink()
+    client = opc.Client(sink.server_ip_port)
+    ...
+    print(sink.received)
+    sink.stop()
+
+"""
+
+import ctypes
+import multiprocessing
+import select
+import socket
+
+
+def _serve(listener, received, stop):
+    connections = []
+    buffer = bytearray(1 << 20)
+    while not stop.is_set():
+        readable = select.select([listener] + connections, [], [], 0.1)[0]
+        for sock in readable:
+            if sock is listener:
+                connections.append(listener.accept()[0])
+                continue
+            try:
+                n = sock.recv_into(buffer)
+            except socket.error:
+                n = 0
+            if n:
+                received.value += n
+            else:
+                sock.close()
+                connections.remove(sock)
+    for sock in connections:
+        sock.close()
+    listener.close()
+
+
+class NullSink(object):
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """Start an OPC server in a separate process which reads and discards everything sent to it.
+
+        It accepts any number of connections.  Its address is in
+        self.server_ip_port.  Running in its own process, it doesn't compete
+        with the client for Python's global interpreter lock.
+
+        """
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+        # clients in short connection mode connect very often
+        listener.listen(socket.SOMAXCONN)
+        self.server_ip_port = '%s:%d' % listener.getsockname()
+
+        self._received = multiprocessing.Value(ctypes.c_ulonglong, 0, lock=False)
+        self._stop = multiprocessing.Event()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(listener, self._received, self._stop))
+        self._process.daemon = True
+        self._process.start()
+        listener.close()
+
+    @property
+    def received(self):
+        """The number of bytes received so far."""
+        return self._received.value
+
+    def stop(self):
+        """Stop the server and close its connections."""
+        self._stop.set()
+        self._process.join()
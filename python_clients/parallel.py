@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+"""Render per-pixel patterns on several cores at once.
+
+A pattern which only has a pure Python pixel_color function computes the
+pixels one at a time, on one core.  PoolRenderer splits the layout's pixels
+into slices and hands each slice to a worker process, which calls
+pixel_color for its pixels and writes their colors straight into a frame
+buffer in shared memory.  The main process then sends that buffer as is.
+
+It works like patterns.Renderer, but with a pattern module's pixel_color
+instead of its frame_colors.  The same workers render every pattern they're
+given, so switching patterns, or rendering several layers with a
+compositor.Compositor, doesn't start new processes.
+
+Recommended use:
+
+    import parallel
+    import patterns.miami
+
+    renderer = parallel.PoolRenderer(coordinates)
+    while True:
+        t = time.time() - start_time
+        pixels = renderer.frame_colors(patterns.miami, t)
+        client.put_pixels(pixels, channel=0)
+
+"""
+
+from __future__ import division
+import ctypes
+import importlib
+import multiprocessing
+import random
+import traceback
+from multiprocessing import sharedctypes
+
+try:
+    from importlib import reload
+except ImportError:
+    pass  # Python 2's reload is a builtin
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import opc
+
+
+def _load(pattern_name, reload_module):
+    """Return the pattern module's pixel_color function, or the error loading it as a string."""
+    try:
+        module = importlib.import_module(pattern_name)
+        if reload_module:
+            module = reload(module)
+        return module.pixel_color
+    except Exception:
+        return traceback.format_exc()
+
+
+def _worker(conn, coordinates, start, n_pixels, random_values, frame):
+    """Render the pixels from start to start+len(coordinates) into frame.
+
+    Each message on conn is (pattern module name, t) to render a frame, or
+    (pattern module name, None) to reload the pattern's code before its
+    next frame.
+
+    """
+    pixel_colors = {}  # pattern module name -> its pixel_color, or the error loading it
+    stale = set()      # names of the patterns to reload
+    address = ctypes.addressof(frame) + start * 3
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            # the main process has gone away
+            break
+        if message is None:
+            break
+        pattern_name, t = message
+        if t is None:
+            pixel_colors.pop(pattern_name, None)
+            stale.add(pattern_name)
+            continue
+        if pattern_name not in pixel_colors:
+            pixel_colors[pattern_name] = _load(pattern_name, pattern_name in stale)
+            stale.discard(pattern_name)
+        pixel_color = pixel_colors[pattern_name]
+        if not callable(pixel_color):
+            # report the error for each frame instead of dying, so that the
+            # main process doesn't wait forever
+            conn.send(pixel_color)
+            continue
+        try:
+            colors = [pixel_color(t, coord, start + ii, n_pixels, random_values)
+                      for ii, coord in enumerate(coordinates)]
+            data = bytes(opc._pixel_bytes(colors))
+            ctypes.memmove(address, data, len(data))
+            conn.send(None)
+        except Exception:
+            conn.send(traceback.format_exc())
+    conn.close()
+
+
+class PoolRenderer(object):
+
+    def __init__(self, coordinates, random_values=None, processes=None):
+        """Create an object which renders patterns on a layout using a pool of processes.
+
+        coordinates: a list or array of (x, y, z) pixel positions
+        random_values: optional list of a constant random value for each
+            pixel.  If not given, new ones are generated.
+        processes: how many worker processes to use.  By default, one per core.
+
+        """
+        self.coordinates = [tuple(float(c) for c in coord) for coord in coordinates]
+        self.n_pixels = len(self.coordinates)
+        if random_values is None:
+            random_values = [random.random() for ii in range(self.n_pixels)]
+        self.random_values = list(random_values)
+        self.processes = min(processes or multiprocessing.cpu_count(), max(self.n_pixels, 1))
+
+        # (r, g, b) bytes for each pixel, written to by the workers
+        self._frame = sharedctypes.RawArray(ctypes.c_ubyte, self.n_pixels * 3)
+        # the same bytes as an array, for copying into PixelBuffers
+        self._colors = None
+        if numpy is not None:
+            self._colors = numpy.frombuffer(self._frame, dtype=numpy.uint8).reshape(-1, 3)
+        self._workers = []  # (process, connection) pairs
+
+    def _start(self):
+        bounds = [self.n_pixels * ii // self.processes for ii in range(self.processes + 1)]
+        for start, stop in zip(bounds, bounds[1:]):
+            conn, worker_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(
+                worker_conn, self.coordinates[start:stop], start,
+                self.n_pixels, self.random_values, self._frame))
+            process.daemon = True
+            process.start()
+            worker_conn.close()
+            self._workers.append((process, conn))
+
+    def close(self):
+        """Stop the worker processes.  They're started again by the next frame_colors call."""
+        for process, conn in self._workers:
+            try:
+                conn.send(None)
+            except (IOError, OSError):
+                pass
+            conn.close()
+        for process, conn in self._workers:
+            process.join()
+        self._workers = []
+
+    def forget(self, pattern):
+        """Have the workers reload the pattern's module before its next frame, e.g. because its code changed."""
+        for process, conn in self._workers:
+            conn.send((pattern.__name__, None))
+
+    def frame_colors(self, pattern, t, out=None):
+        """Return the colors of all the pixels from the pattern module at time t.
+
+        The workers are started the first time, and each one imports the
+        pattern module the first time it's asked for.  As for
+        patterns.Renderer, t is multiplied by the pattern's SPEED.
+
+        Returns a memoryview of (r, g, b) bytes, which can be given directly
+        to opc.Client.put_pixels.  It's overwritten by the next call.
+
+        out: an optional opc.PixelBuffer to put the colors in, which is
+            then returned instead.
+
+        """
+        if not self._workers:
+            self._start()
+        for process, conn in self._workers:
+            conn.send((pattern.__name__, t * getattr(pattern, 'SPEED', 1)))
+        errors = [conn.recv() for process, conn in self._workers]
+        for error in errors:
+            if error is not None:
+                raise RuntimeError('error in %s worker:\n%s' % (pattern.__name__, error))
+        if out is None:
+            return memoryview(self._frame)
+        out[:] = self._colors
+        return out
@@ -0,0 +1,140 @@
+"""Patterns which compute a whole frame of pixel colors at once.
+
+Each module in this package is the array version of one of the example
+clients.  It keeps the client's original per-pixel function
+
+    pixel_color(t, coord, ii, n_pixels, random_values)
+
+and adds
+
+    frame_colors(t, coordinates, ii, n_pixels, random_values)
+
+which computes the same colors for every pixel in one go:
+
+    t: time in seconds since the program started
+    coordinates: float array of (x, y, z) pixel positions shaped (n_pixels, 3)
+    ii: int array of pixel indices shaped (n_pixels,)
+    n_pixels: the total number of pixels
+    random_values: float array of a constant random value for each pixel
+
+frame_colors returns a float array of (r, g, b) colors shaped (n_pixels, 3)
+in the range 0-255, which can be given directly to opc.Client.put_pixels.
+If it's given an out keyword argument, an array of that shape, it puts the
+colors there instead of in a new array.
+
+Work which doesn't depend on t can be split out of frame_colors into
+
+    precompute(coordinates, ii, n_pixels, random_values)
+
+which returns the results in a dict.  frame_colors then takes that dict as
+a static keyword argument, so that it only has to do the work which changes
+from frame to frame.  A Renderer runs each pattern's precompute once for its
+layout and keeps the results.
+
+A module can also set SPEED, a number which renderers multiply t by before
+calling frame_colors, so that the pattern moves at the same speed wherever
+it's shown.
+
+Recommended use:
+
+    import patterns
+    import patterns.miami
+
+    renderer = patterns.Renderer(coordinates)
+    while True:
+        t = time.time() - start_time
+        pixels = renderer.frame_colors(patterns.miami, t)
+        client.put_pixels(pixels, channel=0)
+
+To reuse the same memory for every frame, pass an opc.PixelBuffer as out,
+which the pattern writes its colors straight into:
+
+    frame = opc.PixelBuffer(renderer.n_pixels)
+    while True:
+        renderer.frame_colors(patterns.miami, t, out=frame)
+        client.put_pixels(frame, channel=0)
+
+"""
+
+import numpy
+
+
+def frame_inputs(coordinates, random_values=None):
+    """Return the arrays that frame_colors expects for a layout.
+
+    coordinates: a list of (x, y, z) tuples, as parsed from a layout file
+    random_values: optional list of a constant random value for each pixel.
+        If not given, new ones are generated.
+
+    Returns (coordinates, ii, n_pixels, random_values).
+
+    """
+    coordinates = numpy.array(coordinates, dtype=float).reshape(-1, 3)
+    n_pixels = len(coordinates)
+    ii = numpy.arange(n_pixels)
+    if random_values is None:
+        random_values = numpy.random.random(n_pixels)
+    else:
+        random_values = numpy.array(random_values, dtype=float)
+    return coordinates, ii, n_pixels, random_values
+
+
+def _takes_out(pattern):
+    """Return True if the pattern module's frame_colors has an out argument."""
+    code = pattern.frame_colors.__code__
+    return 'out' in code.co_varnames[:code.co_argcount]
+
+
+class Renderer(object):
+
+    def __init__(self, coordinates, random_values=None):
+        """Create an object which renders patterns on a layout.
+
+        coordinates and random_values are as for frame_inputs.
+
+        """
+        (self.coordinates, self.ii, self.n_pixels,
+            self.random_values) = frame_inputs(coordinates, random_values)
+        self._static = {}  # pattern module name -> result of its precompute
+
+    def static(self, pattern):
+        """Return the result of the pattern module's precompute for this layout.
+
+        It's only computed the first time.  Returns None if the pattern
+        doesn't have a precompute function.
+
+        """
+        if not hasattr(pattern, 'precompute'):
+            return None
+        if pattern.__name__ not in self._static:
+            self._static[pattern.__name__] = pattern.precompute(
+                self.coordinates, self.ii, self.n_pixels, self.random_values)
+        return self._static[pattern.__name__]
+
+    def forget(self, pattern):
+        """Drop the pattern's precomputed results, e.g. because its code changed."""
+        self._static.pop(pattern.__name__, None)
+
+    def frame_colors(self, pattern, t, out=None):
+        """Return the colors of all the pixels from the pattern module at time t.
+
+        t is multiplied by the pattern's SPEED, if it has one.
+
+        out: an optional opc.PixelBuffer to put the colors in, which is
+            then returned instead of an array.
+
+        """
+        t = t * getattr(pattern, 'SPEED', 1)
+        args = (t, self.coordinates, self.ii, self.n_pixels, self.random_values)
+        kwargs = {}
+        static = self.static(pattern)
+        if static is not None:
+            kwargs['static'] = static
+        if out is not None and _takes_out(pattern):
+            pattern.frame_colors(*args, out=out.colors, **kwargs)
+            return out
+        colors = pattern.frame_colors(*args, **kwargs)
+        if out is None:
+            return colors
+        out[:] = colors
+        return out
@@ -0,0 +1,139 @@
+"""Moving blobby colors.
+
+Used by python_clients/lava_lamp.py.
+
+"""
+
+from __future__ import division
+
+import numpy
+
+import color_utils
+
+# how fast the pattern moves; renderers multiply t by this
+SPEED = 0.6
+
+
+def pixel_color(t, coord, ii, n_pixels, random_values):
+    """Compute the color of a given pixel.
+
+    t: time in seconds since the program started.
+    ii: which pixel this is, starting at 0
+    coord: the (x, y, z) position of the pixel as a tuple
+    n_pixels: the total number of pixels
+    random_values: a list containing a constant random value for each pixel
+
+    Returns an (r, g, b) tuple in the range 0-255
+
+    """
+    # make moving stripes for x, y, and z
+    x, y, z = coord
+    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
+    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+
+    # rotate
+    x, y, z = y, z, x
+
+#     # shift some of the pixels to a new xyz location
+#     if ii % 17 == 0:
+#         x += ((ii*123)%5) / n_pixels * 32.12 + 0.1
+#         y += ((ii*137)%5) / n_pixels * 22.23 + 0.1
+#         z += ((ii*147)%7) / n_pixels * 44.34 + 0.1
+
+    # make x, y, z -> r, g, b sine waves
+    r = color_utils.cos(x, offset=t / 4, period=2, minn=0, maxx=1)
+    g = color_utils.cos(y, offset=t / 4, period=2, minn=0, maxx=1)
+    b = color_utils.cos(z, offset=t / 4, period=2, minn=0, maxx=1)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.5)
+#     r, g, b = color_utils.clip_black_by_luminance((r, g, b), 0.5)
+
+#     # shift the color of a few outliers
+#     if random_values[ii] < 0.03:
+#         r, g, b = b, g, r
+
+    # black out regions
+    r2 = color_utils.cos(x, offset=t / 10 + 12.345, period=3, minn=0, maxx=1)
+    g2 = color_utils.cos(y, offset=t / 10 + 24.536, period=3, minn=0, maxx=1)
+    b2 = color_utils.cos(z, offset=t / 10 + 34.675, period=3, minn=0, maxx=1)
+    clampdown = (r2 + g2 + b2)/2
+    clampdown = color_utils.remap(clampdown, 0.8, 0.9, 0, 1)
+    clampdown = color_utils.clamp(clampdown, 0, 1)
+    r *= clampdown
+    g *= clampdown
+    b *= clampdown
+
+    # color scheme: fade towards blue-and-orange
+#     g = (r+b) / 2
+    g = g * 0.6 + ((r+b) / 2) * 0.4
+
+    # apply gamma curve
+    # only do this on live leds, not in the simulator
+    #r, g, b = color_utils.gamma((r, g, b), 2.2)
+
+    return (r*256, g*256, b*256)
+
+
+def precompute(coordinates, ii, n_pixels, random_values):
+    """Compute the parts of the colors which don't change over time.
+
+    Takes the same arguments as frame_colors, without t, and returns
+    a dict to pass to it as static.
+
+    """
+    # make moving stripes for x, y, and z
+    x, y, z = coordinates.T
+    y = y + color_utils.cos_array(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z = z + color_utils.cos_array(x, offset=0, period=1, minn=0, maxx=0.3)
+    x = x + color_utils.cos_array(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+
+    # rotate
+    x, y, z = y, z, x
+
+    return {'x': x, 'y': y, 'z': z}
+
+
+def frame_colors(t, coordinates, ii, n_pixels, random_values, static=None, out=None):
+    """Compute the colors of all the pixels at once.
+
+    static: the result of precompute for these arguments.  If not given,
+        it's computed on the spot.
+
+    out: an optional float array shaped (n_pixels, 3) to put the colors
+        in, which is then returned instead of a new array.
+
+    Returns a float array of (r, g, b) colors shaped (n_pixels, 3)
+    in the range 0-255.  See pixel_color for the per-pixel version.
+
+    """
+    if static is None:
+        static = precompute(coordinates, ii, n_pixels, random_values)
+    x, y, z = static['x'], static['y'], static['z']
+
+    # make x, y, z -> r, g, b sine waves
+    r = color_utils.cos_array(x, offset=t / 4, period=2, minn=0, maxx=1)
+    g = color_utils.cos_array(y, offset=t / 4, period=2, minn=0, maxx=1)
+    b = color_utils.cos_array(z, offset=t / 4, period=2, minn=0, maxx=1)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.5)
+
+    # black out regions
+    r2 = color_utils.cos_array(x, offset=t / 10 + 12.345, period=3, minn=0, maxx=1)
+    g2 = color_utils.cos_array(y, offset=t / 10 + 24.536, period=3, minn=0, maxx=1)
+    b2 = color_utils.cos_array(z, offset=t / 10 + 34.675, period=3, minn=0, maxx=1)
+    clampdown = (r2 + g2 + b2)/2
+    clampdown = color_utils.remap_array(clampdown, 0.8, 0.9, 0, 1, out=clampdown)
+    clampdown = color_utils.clamp_array(clampdown, 0, 1, out=clampdown)
+    r *= clampdown
+    g *= clampdown
+    b *= clampdown
+
+    # color scheme: fade towards blue-and-orange
+    g = g * 0.6 + ((r+b) / 2) * 0.4
+
+    if out is None:
+        return numpy.column_stack((r, g, b)) * 256
+    out[:, 0] = r
+    out[:, 1] = g
+    out[:, 2] = b
+    out *= 256
+    return out
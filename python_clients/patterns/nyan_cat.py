@@ -0,0 +1,164 @@
+"""Every few seconds, a sparkly rainbow washes across the LEDs.
+
+Used by python_clients/nyan_cat.py.
+
+"""
+
+from __future__ import division
+import time
+
+import numpy
+
+import color_utils
+
+# how fast the pattern moves; renderers multiply t by this
+SPEED = 0.6
+
+
+def pixel_color(t, coord, ii, n_pixels, random_values):
+    """Compute the color of a given pixel.
+
+    t: time in seconds since the program started.
+    ii: which pixel this is, starting at 0
+    coord: the (x, y, z) position of the pixel as a tuple
+    n_pixels: the total number of pixels
+    random_values: a list containing a constant random value for each pixel
+
+    Returns an (r, g, b) tuple in the range 0-255
+
+    """
+    # make moving stripes for x, y, and z
+    x, y, z = coord
+    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
+    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+
+    # rotate
+    x, y, z = y, z, x
+
+    # shift some of the pixels to a new xyz location
+    if ii % 7 == 0:
+        x += ((ii*123)%5) / n_pixels * 32.12
+        y += ((ii*137)%5) / n_pixels * 22.23
+        z += ((ii*147)%7) / n_pixels * 44.34
+
+    # make x, y, z -> r, g, b sine waves
+    r = color_utils.cos(x, offset=t / 4, period=2, minn=0, maxx=1)
+    g = color_utils.cos(y, offset=t / 4, period=2, minn=0, maxx=1)
+    b = color_utils.cos(z, offset=t / 4, period=2, minn=0, maxx=1)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.5)
+
+    # a moving wave across the pixels, usually dark.
+    # lines up with the wave of twinkles
+    fade = color_utils.cos(t - ii/n_pixels, offset=0, period=7, minn=0, maxx=1) ** 20
+    r *= fade
+    g *= fade
+    b *= fade
+
+#     # stretched vertical smears
+#     v = color_utils.cos(ii / n_pixels, offset=t*0.1, period = 0.07, minn=0, maxx=1) ** 5 * 0.3
+#     r += v
+#     g += v
+#     b += v
+
+    # twinkle occasional LEDs
+    twinkle_speed = 0.07
+    twinkle_density = 0.1
+    twinkle = (random_values[ii]*7 + time.time()*twinkle_speed) % 1
+    twinkle = abs(twinkle*2 - 1)
+    twinkle = color_utils.remap(twinkle, 0, 1, -1/twinkle_density, 1.1)
+    twinkle = color_utils.clamp(twinkle, -0.5, 1.1)
+    twinkle **= 5
+    twinkle *= color_utils.cos(t - ii/n_pixels, offset=0, period=7, minn=0, maxx=1) ** 20
+    twinkle = color_utils.clamp(twinkle, -0.3, 1)
+    r += twinkle
+    g += twinkle
+    b += twinkle
+
+    # apply gamma curve
+    # only do this on live leds, not in the simulator
+    #r, g, b = color_utils.gamma((r, g, b), 2.2)
+
+    return (r*256, g*256, b*256)
+
+
+def precompute(coordinates, ii, n_pixels, random_values):
+    """Compute the parts of the colors which don't change over time.
+
+    Takes the same arguments as frame_colors, without t, and returns
+    a dict to pass to it as static.
+
+    """
+    # make moving stripes for x, y, and z
+    x, y, z = coordinates.T
+    y = y + color_utils.cos_array(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z = z + color_utils.cos_array(x, offset=0, period=1, minn=0, maxx=0.3)
+    x = x + color_utils.cos_array(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+
+    # rotate
+    x, y, z = y, z, x
+
+    # shift some of the pixels to a new xyz location
+    shifted = ii % 7 == 0
+    x[shifted] += ((ii[shifted]*123)%5) / n_pixels * 32.12
+    y[shifted] += ((ii[shifted]*137)%5) / n_pixels * 22.23
+    z[shifted] += ((ii[shifted]*147)%7) / n_pixels * 44.34
+
+    # where each pixel is in the waves moving along the layout, and when
+    # it twinkles
+    return {'x': x, 'y': y, 'z': z,
+            'pct': ii / n_pixels,
+            'twinkle_phase': random_values * 7}
+
+
+def frame_colors(t, coordinates, ii, n_pixels, random_values, static=None, out=None):
+    """Compute the colors of all the pixels at once.
+
+    static: the result of precompute for these arguments.  If not given,
+        it's computed on the spot.
+
+    out: an optional float array shaped (n_pixels, 3) to put the colors
+        in, which is then returned instead of a new array.
+
+    Returns a float array of (r, g, b) colors shaped (n_pixels, 3)
+    in the range 0-255.  See pixel_color for the per-pixel version.
+
+    """
+    if static is None:
+        static = precompute(coordinates, ii, n_pixels, random_values)
+    x, y, z = static['x'], static['y'], static['z']
+
+    # make x, y, z -> r, g, b sine waves
+    r = color_utils.cos_array(x, offset=t / 4, period=2, minn=0, maxx=1)
+    g = color_utils.cos_array(y, offset=t / 4, period=2, minn=0, maxx=1)
+    b = color_utils.cos_array(z, offset=t / 4, period=2, minn=0, maxx=1)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.5)
+
+    # a moving wave across the pixels, usually dark.
+    # lines up with the wave of twinkles
+    fade = color_utils.cos_array(t - static['pct'], offset=0, period=7, minn=0, maxx=1) ** 20
+    r *= fade
+    g *= fade
+    b *= fade
+
+    # twinkle occasional LEDs
+    twinkle_speed = 0.07
+    twinkle_density = 0.1
+    twinkle = (static['twinkle_phase'] + time.time()*twinkle_speed) % 1
+    twinkle = abs(twinkle*2 - 1)
+    twinkle = color_utils.remap_array(twinkle, 0, 1, -1/twinkle_density, 1.1, out=twinkle)
+    twinkle = color_utils.clamp_array(twinkle, -0.5, 1.1, out=twinkle)
+    twinkle **= 5
+    twinkle *= fade
+    twinkle = color_utils.clamp_array(twinkle, -0.3, 1, out=twinkle)
+    r += twinkle
+    g += twinkle
+    b += twinkle
+
+    if out is None:
+        return numpy.column_stack((r, g, b)) * 256
+    out[:, 0] = r
+    out[:, 1] = g
+    out[:, 2] = b
+    out *= 256
+    return out
@@ -0,0 +1,92 @@
+"""Every few seconds, a wave of sparkles washes across the LEDs.
+
+Used by python_clients/sailor_moon.py.
+
+"""
+
+from __future__ import division
+import time
+
+import numpy
+
+import color_utils
+
+# how fast the pattern moves; renderers multiply t by this
+SPEED = 0.6
+
+
+def pixel_color(t, coord, ii, n_pixels, random_values):
+    """Compute the color of a given pixel.
+
+    t: time in seconds since the program started.
+    ii: which pixel this is, starting at 0
+    coord: the (x, y, z) position of the pixel as a tuple
+
+    Returns an (r, g, b) tuple in the range 0-255
+
+    """
+
+#     # random persistant color per pixel
+#     r = color_utils.remap(random_values[(ii+0)%n_pixels], 0, 1, 0.2, 1)
+#     g = color_utils.remap(random_values[(ii+3)%n_pixels], 0, 1, 0.2, 1)
+#     b = color_utils.remap(random_values[(ii+6)%n_pixels], 0, 1, 0.2, 1)
+
+    # random assortment of a few colors per pixel: pink, cyan, white
+    if random_values[ii] < 0.5:
+        r, g, b = (1, 0.3, 0.8)
+    elif random_values[ii] < 0.85:
+        r, g, b = (0.4, 0.7, 1)
+    else:
+        r, g, b = (2, 0.6, 1.6)
+
+    # twinkle occasional LEDs
+    twinkle_speed = 0.07
+    twinkle_density = 0.1
+    twinkle = (random_values[ii]*7 + time.time()*twinkle_speed) % 1
+    twinkle = abs(twinkle*2 - 1)
+    twinkle = color_utils.remap(twinkle, 0, 1, -1/twinkle_density, 1.1)
+    twinkle = color_utils.clamp(twinkle, -0.5, 1.1)
+    twinkle **= 5
+    twinkle *= color_utils.cos(t - ii/n_pixels, offset=0, period=7, minn=0.1, maxx=1.0) ** 20
+    twinkle = color_utils.clamp(twinkle, -0.3, 1)
+    r *= twinkle
+    g *= twinkle
+    b *= twinkle
+
+    # apply gamma curve
+    # only do this on live leds, not in the simulator
+    #r, g, b = color_utils.gamma((r, g, b), 2.2)
+
+    return (r*256, g*256, b*256)
+
+
+def frame_colors(t, coordinates, ii, n_pixels, random_values, out=None):
+    """Compute the colors of all the pixels at once.
+
+    out: an optional float array shaped (n_pixels, 3) to put the colors
+        in, which is then returned instead of a new array.
+
+    Returns a float array of (r, g, b) colors shaped (n_pixels, 3)
+    in the range 0-255.  See pixel_color for the per-pixel version.
+
+    """
+    # random assortment of a few colors per pixel: pink, cyan, white
+    colors = numpy.empty((n_pixels, 3)) if out is None else out
+    colors[:] = (2, 0.6, 1.6)
+    colors[random_values < 0.85] = (0.4, 0.7, 1)
+    colors[random_values < 0.5] = (1, 0.3, 0.8)
+
+    # twinkle occasional LEDs
+    twinkle_speed = 0.07
+    twinkle_density = 0.1
+    twinkle = (random_values*7 + time.time()*twinkle_speed) % 1
+    twinkle = abs(twinkle*2 - 1)
+    twinkle = color_utils.remap_array(twinkle, 0, 1, -1/twinkle_density, 1.1, out=twinkle)
+    twinkle = color_utils.clamp_array(twinkle, -0.5, 1.1, out=twinkle)
+    twinkle **= 5
+    twinkle *= color_utils.cos_array(t - ii/n_pixels, offset=0, period=7, minn=0.1, maxx=1.0) ** 20
+    twinkle = color_utils.clamp_array(twinkle, -0.3, 1, out=twinkle)
+    colors *= twinkle[:, numpy.newaxis]
+
+    colors *= 256
+    return colors
@@ -0,0 +1,83 @@
+"""Moving stripes for the x, y, and z coordinates, plus a white spot
+which shows the order of the pixels in the layout file.
+
+Used by python_clients/spatial_stripes.py.
+
+"""
+
+from __future__ import division
+
+import numpy
+
+import color_utils
+
+
+def pixel_color(t, coord, ii, n_pixels, random_values=None):
+    """Compute the color of a given pixel.
+
+    t: time in seconds since the program started.
+    ii: which pixel this is, starting at 0
+    coord: the (x, y, z) position of the pixel as a tuple
+    n_pixels: the total number of pixels
+    random_values: unused
+
+    Returns an (r, g, b) tuple in the range 0-255
+
+    """
+    # make moving stripes for x, y, and z
+    x, y, z = coord
+    r = color_utils.cos(x, offset=t / 4, period=1, minn=0, maxx=0.7)
+    g = color_utils.cos(y, offset=t / 4, period=1, minn=0, maxx=0.7)
+    b = color_utils.cos(z, offset=t / 4, period=1, minn=0, maxx=0.7)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 2)
+
+    # make a moving white dot showing the order of the pixels in the layout file
+    spark_ii = (t*80) % n_pixels
+    spark_rad = 8
+    spark_val = max(0, (spark_rad - color_utils.mod_dist(ii, spark_ii, n_pixels)) / spark_rad)
+    spark_val = min(1, spark_val*2)
+    r += spark_val
+    g += spark_val
+    b += spark_val
+
+    # apply gamma curve
+    # only do this on live leds, not in the simulator
+    #r, g, b = color_utils.gamma((r, g, b), 2.2)
+
+    return (r*256, g*256, b*256)
+
+
+def frame_colors(t, coordinates, ii, n_pixels, random_values=None, out=None):
+    """Compute the colors of all the pixels at once.
+
+    out: an optional float array shaped (n_pixels, 3) to put the colors
+        in, which is then returned instead of a new array.
+
+    Returns a float array of (r, g, b) colors shaped (n_pixels, 3)
+    in the range 0-255.  See pixel_color for the per-pixel version.
+
+    """
+    # make moving stripes for x, y, and z
+    x, y, z = coordinates.T
+    r = color_utils.cos_array(x, offset=t / 4, period=1, minn=0, maxx=0.7)
+    g = color_utils.cos_array(y, offset=t / 4, period=1, minn=0, maxx=0.7)
+    b = color_utils.cos_array(z, offset=t / 4, period=1, minn=0, maxx=0.7)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 2)
+
+    # make a moving white dot showing the order of the pixels in the layout file
+    spark_ii = (t*80) % n_pixels
+    spark_rad = 8
+    spark_dist = color_utils.mod_dist_array(ii, spark_ii, n_pixels)
+    spark_val = numpy.maximum(0, (spark_rad - spark_dist) / spark_rad)
+    spark_val = numpy.minimum(1, spark_val*2)
+    r += spark_val
+    g += spark_val
+    b += spark_val
+
+    if out is None:
+        return numpy.column_stack((r, g, b)) * 256
+    out[:, 0] = r
+    out[:, 1] = g
+    out[:, 2] = b
+    out *= 256
+    return out
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+
+"""Measure where the time goes in a frame loop.
+
+A Profiler keeps a histogram of how long each stage of a frame takes:
+
+    render: computing the colors
+    correct: color correction in opc.Client
+    pack: converting pixels to OPC messages in opc.Client
+    send: writing the messages to the socket in opc.Client
+    sleep: waiting for the next frame in scheduler.FrameScheduler
+
+The time spent in each stage is added up over a frame, and recorded when
+the frame ends.  The histograms have a fixed number of buckets, so
+recording a time costs the same however long the loop runs, and a
+summary can be printed every few seconds.
+
+Recommended use:
+
+    import profiling
+
+    profiler = profiling.Profiler(interval=10)  # print a summary every 10 seconds
+    profiler.install_signal()  # kill -USR1 <pid> to run cProfile for 100 frames
+    client.set_profiler(profiler)
+    frame_scheduler = scheduler.FrameScheduler(fps, profiler=profiler)
+    while True:
+        with profiler.stage('render'):
+            renderer.frame_colors(patterns.miami, t, out=frame)
+        client.put_pixels(frame, channel=0)
+        frame_scheduler.wait()  # records the sleep and ends the frame
+
+Without a FrameScheduler, call profiler.frame_done() at the end of each
+frame instead.
+
+Scripts which use optparse can give the same command line options for
+this as runner.py, with add_options and from_options.
+
+"""
+
+from __future__ import division, print_function
+import contextlib
+import json
+import math
+import signal
+import sys
+import time
+
+import opc
+
+# the stages timed by opc.Client, scheduler.FrameScheduler and the pattern
+# loop, in the order they're listed in summaries
+STAGES = ('render', 'correct', 'pack', 'send', 'sleep')
+
+
+class Histogram(object):
+
+    # each doubling of time from 1 microsecond to 2**26 microseconds (about a
+    # minute) is split into this many buckets
+    STEPS = 4
+    N_BUCKETS = 27 * STEPS
+
+    def __init__(self):
+        """Create an empty histogram of durations."""
+        self.counts = [0] * self.N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Count one duration, in seconds."""
+        mantissa, exponent = math.frexp(seconds * 1e6)
+        # mantissa is from 0.5 to 1, so this picks one of STEPS steps in the doubling
+        bucket = exponent * self.STEPS + int((mantissa - 0.5) * 2 * self.STEPS)
+        self.counts[min(max(bucket, 0), self.N_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def _upper_bound(self, bucket):
+        """Return the longest duration in the bucket, in seconds."""
+        exponent, step = divmod(bucket, self.STEPS)
+        return 2 ** (exponent - 1) * (1 + (step + 1) / self.STEPS) / 1e6
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, p):
+        """Return roughly the duration which p percent of the durations are under.
+
+        It's accurate to within about a quarter, the width of a bucket.
+
+        """
+        if not self.count:
+            return 0
+        wanted = p / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted and count:
+                return min(self._upper_bound(bucket), self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * self.N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler(object):
+
+    def __init__(self, interval=None, out=sys.stderr, path=None, clock=opc._clock):
+        """Create a profiler with an empty histogram for each stage.
+
+        interval: print a summary to out every this many seconds, at the end
+            of a frame, then start the histograms over.  None to only
+            print summaries when dump() is called.
+        path: also append each summary to this file, as a line of JSON.
+        clock: the function used to time stages.
+
+        """
+        self.interval = interval
+        self.out = out
+        self.path = path
+        self.clock = clock
+
+        self.histograms = dict((stage, Histogram()) for stage in STAGES)
+        self.frames = 0  # frames since the last summary
+
+        self._current = {}  # stage -> seconds spent in it so far this frame
+        self._started = clock()  # when the histograms were started over
+
+        # for running cProfile: how many frames to run it for, the
+        # cProfile.Profile while it's running, and where to save its stats
+        self._profile_frames = 0
+        self._cprofile = None
+        self._profile_path = None
+
+    def add(self, stage, seconds):
+        """Add time spent in a stage to the current frame."""
+        current = self._current
+        current[stage] = current.get(stage, 0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        """Time a block of code as part of a stage of the current frame."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add(stage, self.clock() - start)
+
+    def frame_done(self):
+        """Record the times for the frame which just ended.
+
+        Only the stages which were timed in the frame are recorded.  Also
+        starts or stops cProfile, and prints a summary if it's time to.
+
+        """
+        histograms = self.histograms
+        for stage, seconds in self._current.items():
+            if stage not in histograms:
+                histograms[stage] = Histogram()
+            histograms[stage].add(seconds)
+        self._current.clear()
+        self.frames += 1
+
+        if self._profile_frames:
+            self._step_cprofile()
+        if self.interval is not None and self.clock() - self._started >= self.interval:
+            self.dump()
+
+    def stats(self):
+        """Return a dict with the frame rate and, for each stage, its times in seconds."""
+        elapsed = self.clock() - self._started
+        result = {
+            'frames': self.frames,
+            'seconds': elapsed,
+            'fps': self.frames / elapsed if elapsed > 0 else 0,
+            'stages': {},
+        }
+        for stage, histogram in self.histograms.items():
+            if histogram.count:
+                result['stages'][stage] = {
+                    'frames': histogram.count,
+                    'mean': histogram.mean(),
+                    'p50': histogram.percentile(50),
+                    'p95': histogram.percentile(95),
+                    'p99': histogram.percentile(99),
+                    'max': histogram.max,
+                }
+        return result
+
+    def summary(self, stats=None):
+        """Return the stats as a table to print."""
+        if stats is None:
+            stats = self.stats()
+        lines = ['    %d frames in %.1f seconds, %.1f fps'
+                 % (stats['frames'], stats['seconds'], stats['fps']),
+                 '        %-8s %7s %9s %9s %9s %9s %9s'
+                 % ('stage', 'frames', 'mean ms', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms')]
+        stages = stats['stages']
+        order = [s for s in STAGES if s in stages] + sorted(s for s in stages if s not in STAGES)
+        for stage in order:
+            s = stages[stage]
+            lines.append('        %-8s %7d %9.3f %9.3f %9.3f %9.3f %9.3f' % (
+                stage, s['frames'], s['mean'] * 1000, s['p50'] * 1000,
+                s['p95'] * 1000, s['p99'] * 1000, s['max'] * 1000))
+        return '\n'.join(lines)
+
+    def dump(self):
+        """Print a summary of the frames so far, and start the histograms over."""
+        stats = self.stats()
+        if self.out is not None:
+            print(self.summary(stats), file=self.out)
+        if self.path is not None:
+            stats['time'] = time.time()
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(stats, sort_keys=True) + '\n')
+        self.reset()
+
+    def reset(self):
+        """Start the histograms over."""
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.frames = 0
+        self._started = self.clock()
+
+    #---------------------------------------------------------------------------
+    # cProfile
+
+    def profile(self, frames=100, path=None):
+        """Run cProfile for the next few frames, starting with the next one.
+
+        When they're done, the functions which took the longest are printed
+        to out, or if path is given, the stats are saved there to be loaded
+        with pstats.
+
+        """
+        if self._cprofile is not None:
+            return  # already running
+        self._profile_frames = frames + 1  # + 1 for the rest of this frame
+        self._profile_path = path
+
+    def install_signal(self, signum=getattr(signal, 'SIGUSR1', None), frames=100, path=None):
+        """Run cProfile for the given number of frames whenever the process gets a signal.
+
+        By default the signal is SIGUSR1, e.g. from "kill -USR1 <pid>".
+        There isn't one on Windows, where this does nothing.
+
+        """
+        if signum is None:
+            return
+        signal.signal(signum, lambda signum, frame: self.profile(frames, path))
+
+    def _step_cprofile(self):
+        """Start, stop or keep cProfile running at the end of a frame."""
+        import cProfile
+        import pstats
+
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._profile_frames -= 1
+        if self._profile_frames:
+            return
+        self._cprofile.disable()
+        if self._profile_path is not None:
+            self._cprofile.dump_stats(self._profile_path)
+        elif self.out is not None:
+            stats = pstats.Stats(self._cprofile, stream=self.out)
+            stats.sort_stats('cumulative').print_stats(25)
+        self._cprofile = None
+
+
+#-------------------------------------------------------------------------------
+# command line
+
+def add_options(parser):
+    """Add --stats, --stats-file and --profile-frames options to an optparse parser."""
+    parser.add_option('--stats', dest='stats', default=None,
+                        action='store', type='float',
+                        help='print how long each stage of a frame takes every this many seconds')
+    parser.add_option('--stats-file', dest='stats_file', default=None,
+                        action='store', type='string',
+                        help='also append the stats to this file as lines of JSON')
+    parser.add_option('--profile-frames', dest='profile_frames', default=100,
+                        action='store', type='int',
+                        help='how many frames to run cProfile for when asked to, e.g. by kill -USR1')
+
+
+def from_options(options):
+    """Return a Profiler set up by the options from add_options.
+
+    kill -USR1 runs cProfile for options.profile_frames frames.
+
+    """
+    profiler = Profiler(options.stats, path=options.stats_file)
+    profiler.install_signal(frames=options.profile_frames)
+    return profiler
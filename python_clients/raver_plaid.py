@@ -24,6 +24,7 @@ import math
 import sys
 
 import opc
+import scheduler
 import color_utils
 
 
@@ -76,6 +77,7 @@ speed_g = -13
 speed_b = 19
 
 start_time = time.time()
+frame_scheduler = scheduler.FrameScheduler(fps)
 while True:
     t = time.time() - start_time
     pixels = []
@@ -92,5 +94,5 @@ while True:
         b = blackstripes * color_utils.remap(math.cos((t/speed_b + pct*freq_b)*math.pi*2), -1, 1, 0, 256)
         pixels.append((r, g, b))
     client.put_pixels(pixels, channel=0)
-    time.sleep(1 / fps)
+    frame_scheduler.wait()
 
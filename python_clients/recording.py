@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+
+"""Record OPC frames to a file and play them back.
+
+A show which is too slow to render live can be rendered once into a
+recording and then played back at full speed.  Use a Recorder in place of
+an opc.Client to record every put_pixels call with its time and channel:
+
+    import recording
+
+    recorder = recording.Recorder('show.opcrec')
+    for frame in range(n_frames):
+        t = frame / fps
+        pixels = renderer.frame_colors(patterns.miami, t)
+        recorder.put_pixels(pixels, channel=0, t=t)
+    recorder.close()
+
+Then stream it to a server at the original rate, or a faster or slower one:
+
+    player = recording.Player('show.opcrec')
+    player.play(opc.Client('127.0.0.1:7890'), rate=1.0)
+
+or from the command line:
+
+    python_clients/recording.py show.opcrec --server 127.0.0.1:7890
+
+The file holds the OPC messages exactly as they are sent, one after the
+other, followed by an index of each message's time, position, length and
+channel.  The player memory-maps the file and sends slices of it straight
+to the socket, so nothing is parsed or copied per frame.  Messages which
+were recorded at the same time are next to each other in the file, and are
+sent with a single write.
+
+"""
+
+from __future__ import division, print_function
+import mmap
+import optparse
+import struct
+import time
+
+import numpy
+
+import opc
+
+# the file starts with a header: magic, number of frames, offset of the index
+_HEADER = struct.Struct('<8sQQ8x')
+_MAGIC = b'OPCREC01'
+
+# one entry per message, after all the messages
+INDEX_DTYPE = numpy.dtype([
+    ('time', '<f8'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('channel', 'u1'),
+    ('pad', 'V3'),
+])
+
+
+#-------------------------------------------------------------------------------
+# recording
+
+class Recorder(opc.BaseClient):
+
+    def __init__(self, path, client=None, clock=opc._clock):
+        """Create an object which records pixels to a new file at path.
+
+        It has the same put_pixels and set_color_correction methods as
+        opc.Client, so it can be used in place of one.  The messages are
+        recorded with color correction already applied.
+
+        client: an optional opc.Client to also send everything to, so that
+            a live show can be recorded while it's being shown.
+        clock: the function used to time frames when put_pixels isn't given
+            a time.  Times are recorded relative to the first frame.
+
+        Call close() when done, which writes the index.  A recording which
+        wasn't closed can't be played.
+
+        """
+        if client is not None and not isinstance(client, opc.Client):
+            raise TypeError('client must be an opc.Client, not %s' % type(client).__name__)
+        # a Recorder never connects by itself, so the address isn't used
+        opc.BaseClient.__init__(self, 'localhost:0')
+        self.client = client
+        self._clock = clock
+        self._start_time = None
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, 0, 0))
+        self._offset = _HEADER.size
+        self._index = []
+
+    def can_connect(self):
+        if self.client is None:
+            return True
+        return self.client.can_connect()
+
+    def disconnect(self):
+        if self.client is not None:
+            self.client.disconnect()
+
+    def set_skip_unchanged(self, skip=True, keepalive=1.0):
+        """Not supported: every frame is recorded, so playback can start anywhere."""
+        if skip:
+            raise ValueError('a Recorder records every frame, so it can not skip unchanged pixels')
+
+    def put_pixels(self, pixels, channel=0, t=None):
+        """Record the pixels, and send them to the client if there is one.
+
+        t: the time of this frame in seconds.  If not given, the time since
+            the first frame is used.  Times should never decrease.
+
+        Returns True, or if there's a client, whether it sent the pixels.
+
+        """
+        data, frames = self._split(pixels, channel)
+        return self.put_frames(frames or [(channel, data)], t)
+
+    def put_frames(self, frames, t=None):
+        """Record pixels for several channels at the same time.
+
+        frames: as for opc.Client.put_frames.  Each channel is recorded as a
+            separate message, but they're played back with a single write.
+        t: as for put_pixels.
+
+        Returns True, or if there's a client, whether it sent the pixels.
+
+        """
+        if hasattr(frames, 'items'):
+            frames = frames.items()
+        if t is None:
+            now = self._clock()
+            if self._start_time is None:
+                self._start_time = now
+            t = now - self._start_time
+        messages = []
+        for channel, pixels in frames:
+            message = self._build_message(pixels, channel)
+            self._file.write(message)
+            self._index.append((t, self._offset, len(message), channel, b''))
+            self._offset += len(message)
+            messages.append(message)
+        if self.client is not None:
+            return self.client._send_timed(bytearray().join(messages))
+        return True
+
+    def close(self):
+        """Write the index and close the file."""
+        if self._file.closed:
+            return
+        index = numpy.array(self._index, dtype=INDEX_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, len(index), self._offset))
+        self._file.close()
+
+
+#-------------------------------------------------------------------------------
+# playback
+
+class Player(object):
+
+    def __init__(self, path):
+        """Open the recording at path for playback.
+
+        self.index is an array with an entry for each message, in the order
+        they were recorded, with fields time, offset, length and channel.
+        self.duration is the time of the last message.
+
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_frames, index_offset = _HEADER.unpack(self._mmap[:_HEADER.size])
+        if magic != _MAGIC:
+            raise ValueError('%s is not a recording' % path)
+        if index_offset == 0:
+            raise ValueError('%s was not closed properly when recording' % path)
+        self._data = numpy.frombuffer(self._mmap, dtype=numpy.uint8)
+        self.index = numpy.frombuffer(self._mmap, dtype=INDEX_DTYPE,
+                                      count=n_frames, offset=index_offset)
+        self.duration = float(self.index['time'][-1]) if n_frames else 0
+
+        # group the messages with the same time, which can be sent together
+        self._group_times = []
+        self._group_starts = []
+        self._group_ends = []
+        if n_frames:
+            times = self.index['time']
+            starts = numpy.flatnonzero(numpy.r_[True, times[1:] != times[:-1]])
+            ends = numpy.r_[starts[1:], n_frames] - 1
+            self._group_times = times[starts].tolist()
+            self._group_starts = self.index['offset'][starts].tolist()
+            self._group_ends = (self.index['offset'][ends] + self.index['length'][ends]).tolist()
+
+    def __len__(self):
+        return len(self.index)
+
+    def message(self, ii):
+        """Return the ii'th message as a uint8 array backed by the file."""
+        entry = self.index[ii]
+        return self._data[entry['offset']:entry['offset'] + entry['length']]
+
+    def seek(self, t):
+        """Return the position of the first message at or after time t."""
+        return int(numpy.searchsorted(self.index['time'], t))
+
+    def play(self, client, rate=1, start=0, loop=False, sleep=time.sleep, clock=opc._clock):
+        """Send the recording to an opc.Client.
+
+        rate: how fast to play, e.g. 2 for twice as fast.  If None, send
+            everything as fast as possible.
+        start: the time in the recording to start from, in seconds.
+        loop: start again from the beginning after the end, forever.
+
+        If sending falls behind, the late messages are sent right away so
+        that it catches up.  Returns the number of writes which failed
+        because the client couldn't connect or lost its connection.
+
+        """
+        if not isinstance(client, opc.Client):
+            raise TypeError('client must be an opc.Client, not %s' % type(client).__name__)
+        failed = 0
+        group = int(numpy.searchsorted(self._group_times, start))
+        while True:
+            begin = clock()
+            if group < len(self._group_times):
+                origin = self._group_times[group]
+            for ii in range(group, len(self._group_times)):
+                if rate:
+                    delay = begin + (self._group_times[ii] - origin) / rate - clock()
+                    if delay > 0:
+                        sleep(delay)
+                message = self._data[self._group_starts[ii]:self._group_ends[ii]]
+                if not client._send_timed(message):
+                    failed += 1
+            if not loop or not self._group_times:
+                return failed
+            group = 0
+
+    def close(self):
+        """Close the file.  Messages returned by message() can't be used after this."""
+        self.index = self._data = None
+        self._mmap.close()
+
+
+#-------------------------------------------------------------------------------
+# command line
+
+def main():
+    parser = optparse.OptionParser(usage='usage: %prog [options] recording')
+    parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
+                        action='store', type='string',
+                        help='ip and port of server')
+    parser.add_option('-r', '--rate', dest='rate', default=1,
+                        action='store', type='float',
+                        help='playback speed, e.g. 2 for twice as fast.  0 for as fast as possible')
+    parser.add_option('-t', '--start', dest='start', default=0,
+                        action='store', type='float',
+                        help='time in the recording to start at, in seconds')
+    parser.add_option('--loop', dest='loop', default=False,
+                        action='store_true',
+                        help='play the recording over and over')
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('give one recording to play')
+
+    player = Player(args[0])
+    print('    %d messages, %.1f seconds' % (len(player), player.duration))
+
+    client = opc.Client(options.server)
+    if client.can_connect():
+        print('    connected to %s' % options.server)
+    else:
+        # can't connect, but keep running in case the server appears later
+        print('    WARNING: could not connect to %s' % options.server)
+
+    try:
+        failed = player.play(client, rate=options.rate or None,
+                             start=options.start, loop=options.loop)
+    except KeyboardInterrupt:
+        return
+    if failed:
+        print('    %d messages could not be sent' % failed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+"""Run the patterns in python_clients/patterns/, switching between them without restarting.
+
+Unlike the single pattern scripts, the runner keeps one connection to the
+server, one copy of the layout, and each pattern's precomputed arrays for
+as long as it runs.  Switching patterns crossfades from one to the next
+in the same frame loop, so there's no gap with the lights off.
+
+While it runs, a pattern's module is reloaded whenever its file changes,
+so a pattern can be edited and the result seen right away.  If the new
+code has an error, it's printed and the old frame stays up until the
+code is fixed.
+
+To run:
+
+    python_clients/runner.py --layout layouts/wall.json miami lava_lamp
+
+This shows miami, then lava_lamp after --duration seconds, and so on
+around the list.  Type the name of a pattern and press enter to switch to
+it, "next" for the next one in the list, or "list" to see all of them.
+
+Type "stats" to see how long each stage of a frame has been taking, or
+"profile" to run cProfile for --profile-frames frames and print the
+slowest functions.  kill -USR1 also starts cProfile.
+
+"""
+
+from __future__ import division, print_function
+import importlib
+import optparse
+import os
+import pkgutil
+import select
+import sys
+import time
+import traceback
+
+try:
+    from importlib import reload
+except ImportError:
+    pass  # Python 2's reload is a builtin
+
+import compositor
+import layout
+import opc
+import patterns
+import profiling
+import scheduler
+
+# how often to check if the patterns' files have changed, in seconds
+CHECK_INTERVAL = 0.5
+
+
+def available_patterns():
+    """Return the names of the modules in the patterns package."""
+    return sorted(name for _, name, _ in pkgutil.iter_modules(patterns.__path__))
+
+
+def _source_path(module):
+    path = module.__file__
+    if path.endswith('.pyc') or path.endswith('.pyo'):
+        path = path[:-1]
+    return path
+
+
+class Runner(object):
+
+    def __init__(self, client, renderer, crossfade=1, profiler=None, channel=0):
+        """Create an object which shows patterns with renderer and sends them to client.
+
+        crossfade: how many seconds switching patterns takes.
+        profiler: an optional profiling.Profiler to time rendering with.
+        channel: the channel to send the frames to, as for opc.Client.put_pixels.
+
+        """
+        self.client = client
+        self.renderer = renderer
+        self.crossfade = crossfade
+        self.profiler = profiler
+        self.channel = channel
+        self.compositor = compositor.Compositor(renderer)
+        self.frame = opc.PixelBuffer(renderer.n_pixels)
+        self.current = None  # the name of the pattern being shown
+
+        self._modules = {}  # pattern name -> module
+        self._mtimes = {}   # pattern name -> modification time of its file
+        self._next_check = 0
+        self._failing = False  # True while frames can't be rendered
+
+    def load(self, name):
+        """Return the module of the named pattern, importing it the first time."""
+        if name not in self._modules:
+            module = importlib.import_module('patterns.' + name)
+            self._modules[name] = module
+            self._mtimes[name] = os.path.getmtime(_source_path(module))
+        return self._modules[name]
+
+    def show(self, name, t):
+        """Switch to the named pattern at time t."""
+        module = self.load(name)
+        if self.compositor.layers:
+            self.compositor.crossfade(module, t, self.crossfade)
+        else:
+            self.compositor.add(module)
+        self.current = name
+
+    def reload_changed(self):
+        """Reload the patterns whose files have changed.  Returns their names."""
+        reloaded = []
+        for name, module in self._modules.items():
+            try:
+                mtime = os.path.getmtime(_source_path(module))
+            except OSError:
+                continue
+            if mtime == self._mtimes[name]:
+                continue
+            self._mtimes[name] = mtime
+            try:
+                reload(module)
+            except Exception:
+                print('    could not reload %s:' % name, file=sys.stderr)
+                traceback.print_exc()
+                continue
+            # its precomputed arrays may not match the new code
+            self.renderer.forget(module)
+            self._failing = False
+            reloaded.append(name)
+        return reloaded
+
+    def step(self, t):
+        """Render and send the frame for time t.
+
+        Returns True if it was sent, or False if a pattern raised an error,
+        in which case the previous frame stays up.  The error is printed
+        once, rather than for every frame until it's fixed.
+
+        """
+        now = time.time()
+        if now >= self._next_check:
+            self._next_check = now + CHECK_INTERVAL
+            for name in self.reload_changed():
+                print('    reloaded %s' % name)
+        try:
+            if self.profiler is None:
+                self.compositor.render(t, out=self.frame)
+            else:
+                with self.profiler.stage('render'):
+                    self.compositor.render(t, out=self.frame)
+        except Exception:
+            if not self._failing:
+                traceback.print_exc()
+                self._failing = True
+            return False
+        self._failing = False
+        self.client.put_pixels(self.frame, channel=self.channel)
+        return True
+
+
+def _read_command(stdin):
+    """Return a line typed on stdin, '' if there isn't one yet, or None if stdin is closed."""
+    if not select.select([stdin], [], [], 0)[0]:
+        return ''
+    line = stdin.readline()
+    if not line:
+        return None
+    return line.strip()
+
+
+def main():
+    parser = optparse.OptionParser(usage='usage: %prog [options] pattern [pattern ...]')
+    parser.add_option('-l', '--layout', dest='layout',
+                        action='store', type='string',
+                        help='layout file')
+    parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
+                        action='store', type='string',
+                        help='ip and port of server')
+    parser.add_option('-f', '--fps', dest='fps', default=20,
+                        action='store', type='int',
+                        help='frames per second')
+    parser.add_option('-g', '--gamma', dest='gamma', default=1,
+                        action='store', type='float',
+                        help='gamma curve to apply.  use 2.2 for live leds, 1 for the simulator')
+    parser.add_option('-d', '--duration', dest='duration', default=60,
+                        action='store', type='float',
+                        help='seconds to show each pattern before the next one.  0 to stay on the first')
+    parser.add_option('-c', '--crossfade', dest='crossfade', default=1,
+                        action='store', type='float',
+                        help='seconds to crossfade between patterns')
+    parser.add_option('--channel', dest='channel', default=None,
+                        action='store', type='int',
+                        help='channel to send to.  layouts with more pixels than fit in one message '
+                             'go to consecutive channels starting here.  by default, 0 if the '
+                             'layout fits in one message, or 1')
+    profiling.add_options(parser)
+    options, args = parser.parse_args()
+
+    if not options.layout:
+        parser.print_help()
+        print()
+        print('ERROR: you must specify a layout file using --layout')
+        print()
+        sys.exit(1)
+    names = available_patterns()
+    playlist = args or names
+    for name in playlist:
+        if name not in names:
+            parser.error('unknown pattern %r.  the patterns are: %s' % (name, ', '.join(names)))
+
+    coordinates = layout.load(options.layout)
+
+    # channel 0 goes to every channel, so layouts which need several channels
+    # start at 1 unless told otherwise
+    channel = options.channel
+    if channel is None:
+        channel = 0 if len(coordinates) <= opc.MAX_PIXELS else 1
+
+    profiler = profiling.from_options(options)
+
+    client = opc.Client(options.server)
+    client.set_color_correction(gamma=options.gamma)
+    client.set_profiler(profiler)
+    if client.can_connect():
+        print('    connected to %s' % options.server)
+    else:
+        # can't connect, but keep running in case the server appears later
+        print('    WARNING: could not connect to %s' % options.server)
+    print()
+
+    runner = Runner(client, patterns.Renderer(coordinates), options.crossfade, profiler, channel)
+    position = 0
+    start_time = time.time()
+    runner.show(playlist[position], 0)
+    print('    showing %s (control-c to exit)' % runner.current)
+    switch_time = options.duration
+
+    stdin = sys.stdin
+    frame_scheduler = scheduler.FrameScheduler(options.fps, profiler=profiler)
+    while True:
+        t = time.time() - start_time
+
+        command = _read_command(stdin) if stdin else ''
+        if command is None:
+            stdin = None
+        elif command == 'list':
+            print('    patterns: %s' % ', '.join(names))
+        elif command == 'stats':
+            profiler.dump()
+        elif command == 'profile':
+            profiler.profile(options.profile_frames)
+        elif command == 'next' or (options.duration and t >= switch_time and not command):
+            position = (position + 1) % len(playlist)
+            command = playlist[position]
+        if command in names:
+            switch_time = t + options.duration
+            try:
+                runner.show(command, t)
+            except Exception:
+                traceback.print_exc()
+            else:
+                print('    showing %s' % command)
+        elif command and command not in ('list', 'next', 'stats', 'profile'):
+            print('    unknown pattern %r' % command)
+
+        runner.step(t)
+        frame_scheduler.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+"""Run a frame loop at a fixed rate without drifting.
+
+Sleeping for 1/fps after each frame makes the real frame rate lower than
+asked for, by however long it took to render and send the frame.  Instead,
+FrameScheduler keeps a grid of absolute frame deadlines and sleeps until the
+next one, so the time spent on each frame doesn't add up.
+
+Recommended use:
+
+    import scheduler
+
+    frame_scheduler = scheduler.FrameScheduler(fps=20)
+    while True:
+        pixels = ...
+        client.put_pixels(pixels, channel=0)
+        frame_scheduler.wait()
+
+"""
+
+from __future__ import division
+import collections
+import math
+import time
+
+import opc
+
+
+class FrameScheduler(object):
+
+    def __init__(self, fps, policy='skip', max_catchup=10, window=100,
+                 clock=opc._clock, sleep=time.sleep, profiler=None):
+        """Create a scheduler with a deadline every 1/fps seconds.
+
+        policy says what to do when a frame takes longer than 1/fps and
+        misses one or more deadlines:
+        * 'skip': drop the missed frames and wait for the next deadline
+          which is still in the future.  The grid of deadlines is kept, so
+          frames stay evenly spaced.  This is best for animations which are
+          based on the current time.
+        * 'catchup': don't wait, so that the missed frames are run back to
+          back until the loop is on schedule again.  This is best when every
+          frame has to be shown, e.g. when playing back a recording.
+          If more than max_catchup frames behind, the missed frames beyond
+          that are dropped instead.
+
+        window: how many recent frames the fps and jitter stats cover.
+
+        clock and sleep are the functions used to tell the time and to wait.
+
+        profiler: an optional profiling.Profiler.  Each call to wait() adds
+            the time it slept to the sleep stage, then ends the profiler's
+            frame.
+
+        """
+        if policy not in ('skip', 'catchup'):
+            raise ValueError('policy must be "skip" or "catchup", not %r' % policy)
+        self.period = 1 / fps
+        self.policy = policy
+        self.max_catchup = max_catchup
+
+        self._clock = clock
+        self._sleep = sleep
+        self.profiler = profiler
+
+        self.frames = 0   # total number of frames started so far
+        self.dropped = 0  # total number of deadlines skipped without a frame
+        self.late = 0     # total number of frames started after their deadline
+
+        self._deadline = None  # will be None until the first call to wait()
+        self._frame_times = collections.deque(maxlen=window)
+
+    def wait(self):
+        """Wait until it's time to start the next frame.
+
+        The first call returns immediately and starts the grid of deadlines.
+
+        Returns the number of frames dropped since the last call, i.e. the
+        number of deadlines which were missed and skipped.
+
+        """
+        now = self._clock()
+        if self._deadline is None:
+            self._deadline = now
+            self._frame_times.append(now)
+            self.frames += 1
+            if self.profiler is not None:
+                self.profiler.frame_done()
+            return 0
+
+        self._deadline += self.period
+        dropped = 0
+        if now > self._deadline:
+            # the deadline for this frame has already passed
+            behind = int(math.floor((now - self._deadline) / self.period)) + 1
+            if self.policy == 'skip':
+                dropped = behind
+            else:
+                dropped = max(0, behind - self.max_catchup)
+                self.late += 1
+            self._deadline += dropped * self.period
+            self.dropped += dropped
+        if now < self._deadline:
+            before = now
+            self._sleep(self._deadline - now)
+            now = self._clock()
+            if self.profiler is not None:
+                self.profiler.add('sleep', now - before)
+
+        self._frame_times.append(now)
+        self.frames += 1
+        if self.profiler is not None:
+            self.profiler.frame_done()
+        return dropped
+
+    def reset(self):
+        """Forget the grid of deadlines, e.g. after pausing the frame loop.
+
+        The next call to wait() returns immediately and starts a new grid.
+        The stats are kept.
+
+        """
+        self._deadline = None
+
+    @property
+    def fps(self):
+        """The frame rate achieved over the last few frames."""
+        times = self._frame_times
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    @property
+    def jitter(self):
+        """The standard deviation of the time between the last few frames, in seconds."""
+        times = list(self._frame_times)
+        intervals = [b - a for a, b in zip(times, times[1:])]
+        if not intervals:
+            return 0
+        mean = sum(intervals) / len(intervals)
+        return math.sqrt(sum((ii - mean) ** 2 for ii in intervals) / len(intervals))
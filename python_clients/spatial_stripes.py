@@ -23,13 +23,14 @@ from __future__ import division
 import time
 import sys
 import optparse
-try:
-    import json
-except ImportError:
-    import simplejson as json
 
+import layout
 import opc
-import color_utils
+import parallel
+import profiling
+import scheduler
+import patterns
+import patterns.spatial_stripes
 
 
 #-------------------------------------------------------------------------------
@@ -45,6 +46,18 @@ parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
 parser.add_option('-f', '--fps', dest='fps', default=20,
                     action='store', type='int',
                     help='frames per second')
+parser.add_option('-g', '--gamma', dest='gamma', default=1,
+                    action='store', type='float',
+                    help='gamma curve to apply.  use 2.2 for live leds, 1 for the simulator')
+parser.add_option('-p', '--processes', dest='processes', default=0,
+                    action='store', type='int',
+                    help='compute the colors one pixel at a time, split across this many processes')
+parser.add_option('-c', '--channel', dest='channel', default=None,
+                    action='store', type='int',
+                    help='channel to send to.  layouts with more pixels than fit in one message '
+                         'go to consecutive channels starting here.  by default, 0 if the '
+                         'layout fits in one message, or 1')
+profiling.add_options(parser)
 
 options, args = parser.parse_args()
 
@@ -63,16 +76,23 @@ print
 print '    parsing layout file'
 print
 
-coordinates = []
-for item in json.load(open(options.layout)):
-    if 'point' in item:
-        coordinates.append(tuple(item['point']))
+coordinates = layout.load(options.layout)
+
+# channel 0 goes to every channel, so layouts which need several channels
+# start at 1 unless told otherwise
+channel = options.channel
+if channel is None:
+    channel = 0 if len(coordinates) <= opc.MAX_PIXELS else 1
 
 
 #-------------------------------------------------------------------------------
 # connect to server
 
+profiler = profiling.from_options(options)
+
 client = opc.Client(options.server)
+client.set_color_correction(gamma=options.gamma)
+client.set_profiler(profiler)
 if client.can_connect():
     print '    connected to %s' % options.server
 else:
@@ -81,54 +101,24 @@ else:
 print
 
 
-#-------------------------------------------------------------------------------
-# color function
-
-def pixel_color(t, coord, ii, n_pixels):
-    """Compute the color of a given pixel.
-
-    t: time in seconds since the program started.
-    ii: which pixel this is, starting at 0
-    coord: the (x, y, z) position of the pixel as a tuple
-    n_pixels: the total number of pixels
-
-    Returns an (r, g, b) tuple in the range 0-255
-
-    """
-    # make moving stripes for x, y, and z
-    x, y, z = coord
-    r = color_utils.cos(x, offset=t / 4, period=1, minn=0, maxx=0.7)
-    g = color_utils.cos(y, offset=t / 4, period=1, minn=0, maxx=0.7)
-    b = color_utils.cos(z, offset=t / 4, period=1, minn=0, maxx=0.7)
-    r, g, b = color_utils.contrast((r, g, b), 0.5, 2)
-
-    # make a moving white dot showing the order of the pixels in the layout file
-    spark_ii = (t*80) % n_pixels
-    spark_rad = 8
-    spark_val = max(0, (spark_rad - color_utils.mod_dist(ii, spark_ii, n_pixels)) / spark_rad)
-    spark_val = min(1, spark_val*2)
-    r += spark_val
-    g += spark_val
-    b += spark_val
-
-    # apply gamma curve
-    # only do this on live leds, not in the simulator
-    #r, g, b = color_utils.gamma((r, g, b), 2.2)
-
-    return (r*256, g*256, b*256)
-
-
 #-------------------------------------------------------------------------------
 # send pixels
 
 print '    sending pixels forever (control-c to exit)...'
 print
 
-n_pixels = len(coordinates)
+# the colors are computed for the whole frame at once by patterns/spatial_stripes.py,
+# or pixel by pixel in worker processes with --processes
+if options.processes:
+    renderer = parallel.PoolRenderer(coordinates, processes=options.processes)
+else:
+    renderer = patterns.Renderer(coordinates)
+frame = opc.PixelBuffer(len(coordinates))
 start_time = time.time()
+frame_scheduler = scheduler.FrameScheduler(options.fps, profiler=profiler)
 while True:
     t = time.time() - start_time
-    pixels = [pixel_color(t, coord, ii, n_pixels) for ii, coord in enumerate(coordinates)]
-    client.put_pixels(pixels, channel=0)
-    time.sleep(1 / options.fps)
-
+    with profiler.stage('render'):
+        renderer.frame_colors(patterns.spatial_stripes, t, out=frame)
+    client.put_pixels(frame, channel=channel)
+    frame_scheduler.wait()
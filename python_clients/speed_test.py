@@ -1,55 +1,199 @@
 #!/usr/bin/env python
-"""A minimal test pattern.  Use this to measure your maximum frame rate."""
 
+"""Measure how fast frames can be sent to an OPC server.
+
+Sends frames of each size as fast as possible for a few seconds, using each
+combination of connection mode and send strategy, and reports the frames
+per second, megabytes per second, and how long each put_pixels call took.
+
+connection modes:
+    long: keep one connection open (opc.Client's default)
+    short: connect and disconnect for every frame
+
+send strategies:
+    tuples: opc.Client with a list of (r, g, b) tuples
+    bytes: opc.Client with the pixels already packed into bytes
+    numpy: opc.Client with a uint8 numpy array
+    pipelined: opc.PipelinedClient with bytes.  Its put_pixels only hands
+        the frame to the sender thread, so its latency doesn't include
+        sending, and the frame rate only counts frames which weren't dropped.
+        Failed sends aren't counted for it.
+
+By default the frames go to a null server running in the background which
+reads and throws them away, so this measures the client side.  Use --server
+to measure a real server instead.
+
+To run:
+
+    python_clients/speed_test.py
+    python_clients/speed_test.py --server 127.0.0.1:7890 --pixels 1250
+
+"""
+
+from __future__ import division, print_function
+import json
 import optparse
 import sys
-import time
-
-import opc_client
-
-
-parser = optparse.OptionParser()
-parser.add_option('-n', '--num_pixels', dest='num_pixels', default=100,
-                    action='store', type='int', help='number of pixels')
-parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
-                    action='store', type='string', help='server IP and port')
-parser.add_option('-f', '--fps', dest='fps', default=1e9,
-                    action='store', type='int', help='frames per second')
-
-options, args = parser.parse_args()
-socket = opc_client.get_socket(options.server)
-
-black_white = [(0, 0, 0), (2, 2, 2)]
-rgb_bright = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
-red_pixels = [(1, 0, 0)] * options.num_pixels
-green_pixels = [(0, 1, 0)] * options.num_pixels
-blue_pixels = [(0, 0, 1)] * options.num_pixels
-arrays = [red_pixels, green_pixels, blue_pixels]
-frame = 0
-start_time, start_frame = time.time(), frame
-
-print 'First pixel will flash on and off every 10 frames.'
-print 'Second pixel will flash on and off every 100 frames.'
-print 'Third pixel will flash on and off every 1000 frames.'
-print
-print 'Testing %d pixels (Ctrl-C to quit)...' % options.num_pixels
-
-while True:
-    for pixels, bright in zip(arrays, rgb_bright):
-        dim = pixels[0]
-        for i in range(options.num_pixels):
-            pixels[i] = bright
-            pixels[0] = black_white[(frame % 10)/5]
-            pixels[1] = black_white[(frame % 100)/50]
-            pixels[2] = black_white[(frame % 1000)/500]
-            opc_client.put_pixels(socket, 0, pixels)
-            pixels[i] = dim
-            frame += 1
-            if frame % 100 == 0:
-                now = time.time()
-                if now - start_time >= 1.0:
-                    fps = (frame - start_frame) / (now - start_time)
-                    sys.stdout.write('%7.1f fps\r' % fps)
-                    sys.stdout.flush()
-                    start_time, start_frame = now, frame
-        pixels[0] = pixels[1] = pixels[2] = dim
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import opc
+import opc_sink
+
+STRATEGIES = ['tuples', 'bytes', 'numpy', 'pipelined']
+MODES = ['long', 'short']
+
+
+def make_frames(n_pixels, strategy):
+    """Return two different frames of n_pixels in the form the strategy sends."""
+    frames = []
+    for value in (0, 255):
+        tuples = [(value, ii % 256, 255 - value) for ii in range(n_pixels)]
+        if strategy == 'tuples':
+            frames.append(tuples)
+        elif strategy == 'numpy':
+            frames.append(numpy.array(tuples, dtype=numpy.uint8).reshape(-1, 3))
+        else:
+            frames.append(bytes(opc._pixel_bytes(tuples)))
+    return frames
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def run(server, n_pixels, mode, strategy, seconds):
+    """Send frames for the given number of seconds, and return a dict of results."""
+    if strategy == 'pipelined':
+        client = opc.PipelinedClient(server, long_connection=(mode == 'long'))
+    else:
+        client = opc.Client(server, long_connection=(mode == 'long'))
+    client.can_connect()
+    frames = make_frames(n_pixels, strategy)
+
+    latencies = []
+    failed = 0
+    start = opc._clock()
+    end = start + seconds
+    now = start
+    while now < end:
+        ok = client.put_pixels(frames[len(latencies) % 2], channel=0)
+        if not ok and strategy != 'pipelined':
+            failed += 1
+        then, now = now, opc._clock()
+        latencies.append(now - then)
+    # failed puts didn't send a frame
+    sent = len(latencies) - failed
+    if strategy == 'pipelined':
+        # wait for the sender thread to finish the last frame
+        client.close()
+        sent -= client.dropped
+    else:
+        client.disconnect()
+    elapsed = opc._clock() - start
+
+    latencies.sort()
+    message_size = 4 + n_pixels * 3
+    return {
+        'pixels': n_pixels,
+        'mode': mode,
+        'strategy': strategy,
+        'frames': sent,
+        'failed': failed,
+        'fps': sent / elapsed,
+        'mbps': sent * message_size / elapsed / 1e6,
+        'latency_p50_ms': percentile(latencies, 0.5) * 1000,
+        'latency_p90_ms': percentile(latencies, 0.9) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'latency_max_ms': latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-s', '--server', dest='server', default=None,
+                        action='store', type='string',
+                        help='ip and port of server.  default: a null server run by this script')
+    parser.add_option('-n', '--pixels', dest='pixels', default='100,1000,5000,10000,%d' % opc.MAX_PIXELS,
+                        action='store', type='string',
+                        help='comma separated numbers of pixels per frame, up to %d' % opc.MAX_PIXELS)
+    parser.add_option('-m', '--modes', dest='modes', default=','.join(MODES),
+                        action='store', type='string',
+                        help='comma separated connection modes: %s' % ', '.join(MODES))
+    parser.add_option('-x', '--strategies', dest='strategies', default=','.join(STRATEGIES),
+                        action='store', type='string',
+                        help='comma separated send strategies: %s' % ', '.join(STRATEGIES))
+    parser.add_option('-t', '--seconds', dest='seconds', default=2,
+                        action='store', type='float',
+                        help='how long to send frames for each combination')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                        action='store', type='string',
+                        help='save the results to this JSON file')
+    options, args = parser.parse_args()
+
+    pixel_counts = [int(n) for n in options.pixels.split(',')]
+    for n in pixel_counts:
+        if not 0 < n <= opc.MAX_PIXELS:
+            parser.error('the number of pixels must be from 1 to %d' % opc.MAX_PIXELS)
+    modes = options.modes.split(',')
+    strategies = options.strategies.split(',')
+    for name in modes:
+        if name not in MODES:
+            parser.error('unknown connection mode: %s' % name)
+    for name in strategies:
+        if name not in STRATEGIES:
+            parser.error('unknown send strategy: %s' % name)
+    if 'numpy' in strategies and numpy is None:
+        print('WARNING: numpy is not installed, skipping the numpy strategy', file=sys.stderr)
+        strategies.remove('numpy')
+
+    sink = None
+    server = options.server
+    if server is None:
+        sink = opc_sink.NullSink()
+        server = sink.server_ip_port
+    if not opc.Client(server, long_connection=False).can_connect():
+        print('ERROR: could not connect to %s' % server, file=sys.stderr)
+        sys.exit(1)
+
+    header = '%7s %-6s %-10s %9s %8s %9s %9s %9s %9s' % (
+        'pixels', 'mode', 'strategy', 'frames/s', 'MB/s',
+        'p50 ms', 'p90 ms', 'p99 ms', 'max ms')
+    print('sending to %s for %s seconds each' % (server, options.seconds))
+    print()
+    print(header)
+    print('-' * len(header))
+
+    results = []
+    for n_pixels in pixel_counts:
+        for mode in modes:
+            for strategy in strategies:
+                result = run(server, n_pixels, mode, strategy, options.seconds)
+                results.append(result)
+                line = '%7d %-6s %-10s %9.1f %8.2f %9.3f %9.3f %9.3f %9.3f' % (
+                    n_pixels, mode, strategy, result['fps'], result['mbps'],
+                    result['latency_p50_ms'], result['latency_p90_ms'],
+                    result['latency_p99_ms'], result['latency_max_ms'])
+                if result['failed']:
+                    line += '  (%d failed)' % result['failed']
+                print(line)
+                sys.stdout.flush()
+
+    if sink is not None:
+        sink.stop()
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({'server': options.server, 'results': results}, f,
+                      indent=2, sort_keys=True)
+        print()
+        print('saved results to %s' % options.output)
+
+
+if __name__ == '__main__':
+    main()